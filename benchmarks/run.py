@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Benchmarks run without a window and sound card
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from src import display_manager
+from src.assets import SoundController
+from src.display_manager import DisplayManager
+from src.recording import replay
+from src.zeppelin import Zeppelin
+
+THRESHOLDS_PATH = 'benchmarks/thresholds.json'
+RESULTS_PATH = 'benchmark_results.json'
+# Ticks of every scripted flight, shorter than the zeppelin takes to settle after its inputs
+FLIGHT_TICKS = 240
+
+
+def measure(function, duration):
+    """Call the function repeatedly for about the given number of seconds, return microseconds per call"""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < duration:
+        for _ in range(100):
+            function()
+        calls += 100
+        elapsed = time.perf_counter() - start
+    return elapsed / calls * 10 ** 6
+
+
+def flying_zeppelin(scenario):
+    """Return a zeppelin in the state of the given scripted scenario"""
+    zeppelin = Zeppelin()
+    if scenario == 'climb':
+        zeppelin.change_parameter('pressure', -2000)
+    elif scenario == 'cruise':
+        zeppelin.change_parameter('engine_power', 60, hard=True)
+    elif scenario == 'turn':
+        zeppelin.change_parameter('engine_power', 60, hard=True)
+        zeppelin.change_parameter('angular_velocity', 20, hard=True)
+    elif scenario == 'fuel_starvation':
+        zeppelin.change_parameter('engine_power', 80, hard=True)
+        zeppelin.set_parameter('fuel', 0)
+    return zeppelin
+
+
+def measure_flights(scenario, duration):
+    """
+    Fly fresh zeppelins of the scripted scenario for about the given number of seconds, return microseconds per tick
+    Every flight ends before the zeppelin settles, so that the ticks keep following the inputs of the scenario,
+    the zeppelins are created outside the measured time
+    """
+    ticks = 0
+    elapsed = 0
+    while elapsed < duration:
+        zeppelin = flying_zeppelin(scenario)
+        start = time.perf_counter()
+        for _ in range(FLIGHT_TICKS):
+            zeppelin.update_values(16)
+        elapsed += time.perf_counter() - start
+        ticks += FLIGHT_TICKS
+    return elapsed / ticks * 10 ** 6
+
+
+def simulation_benchmarks(duration):
+    results = {}
+    for scenario in ['climb', 'cruise', 'turn', 'fuel_starvation']:
+        results['update_values.' + scenario] = measure_flights(scenario, duration)
+    return results
+
+
+def display_benchmarks(duration):
+    results = {}
+    # Measure the full resolution layout of the cockpit machines, the dummy driver ignores the fullscreen size
+    display_manager.SCREEN_SIZE = display_manager.DESIGN_SIZE
+    display_manager.FULLSCREEN = False
+    zeppelin = flying_zeppelin('turn')
+    manager = DisplayManager(zeppelin)
+
+    # Every draw sees a different value, so that the devices never skip it
+    for parameter, device in manager.devices.items():
+        values = [
+            device.min_value + (device.max_value - device.min_value) * step / 97
+            for step in range(98)
+        ]
+
+        def draw():
+            device.update(values[draw.calls % len(values)])
+            draw.calls += 1
+            return device.draw(manager.screen)
+        draw.calls = 0
+        # Warm up the rotation atlases, they keep the frames of a full turn, so the measured draws only hit them
+        for _ in values:
+            draw()
+        results['device_draw.{}.{}'.format(type(device).__name__, parameter)] = measure(draw, duration)
+
+    results['update_display'] = measure(
+        lambda: (zeppelin.update_values(16), manager.update_display()),
+        duration
+    )
+    return results
+
+
+def sound_benchmarks(duration):
+    zeppelin = flying_zeppelin('climb')
+    sound_controller = SoundController(zeppelin)
+    return {
+        'update_sounds': measure(lambda: (zeppelin.update_values(16), sound_controller.update_sounds()), duration)
+    }
+
+
+def replay_benchmarks(path):
+    """Replay a recorded game, as a realistic workload of the simulation, return microseconds per tick"""
+    start = time.perf_counter()
+    zeppelin, ticks = replay(path)
+    return {'replay': (time.perf_counter() - start) / max(ticks, 1) * 10 ** 6}
+
+
+def simulation_checks():
+    """
+    Return the list of scripted flights ending in a wrong state
+    The derived values are recomputed only when their inputs change, so the checks cover the inputs
+    changed back by the nodes themselves, which a faster graph could miss
+    """
+    failures = []
+    # With an empty tank the engine shutdown keeps restoring the pressure, however long it is decreased
+    zeppelin = flying_zeppelin('fuel_starvation')
+    pressure, height = zeppelin.get_parameter('pressure'), zeppelin.get_parameter('height')
+    for _ in range(600):
+        zeppelin.change_parameter('pressure', -10)
+        zeppelin.update_values(16)
+    if (zeppelin.get_parameter('pressure'), zeppelin.get_parameter('height')) != (pressure, height):
+        failures.append('engine_shutdown.pressure')
+    return failures
+
+
+def check_thresholds(results, thresholds):
+    """Return the list of benchmarks slower than their maximal allowed time"""
+    regressions = []
+    for name, max_microseconds in thresholds.items():
+        if name in results and results[name] > max_microseconds:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the hot paths of the simulator")
+    parser.add_argument('--duration', type=float, default=0.5, help="seconds spent on each benchmark")
+    parser.add_argument('--output', default=RESULTS_PATH, help="file to write the results to, in JSON")
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH, help="JSON file of maximal microseconds per call")
+    parser.add_argument('--recording', help="also measure the replay of the game recorded with main.py --record")
+    args = parser.parse_args()
+
+    failures = simulation_checks()
+    pygame.init()
+    results = {}
+    results.update(simulation_benchmarks(args.duration))
+    results.update(display_benchmarks(args.duration))
+    results.update(sound_benchmarks(args.duration))
+    if args.recording is not None:
+        results.update(replay_benchmarks(args.recording))
+    pygame.quit()
+
+    with open(args.thresholds) as file:
+        thresholds = json.load(file)
+    regressions = check_thresholds(results, thresholds)
+
+    for name, microseconds in results.items():
+        print('{:55} {:10.1f} us {}'.format(name, microseconds, 'REGRESSION' if name in regressions else ''))
+    for name in failures:
+        print('{:55} FAILED'.format(name))
+    with open(args.output, 'w') as file:
+        json.dump({
+            'results_us': results,
+            'thresholds_us': thresholds,
+            'regressions': regressions,
+            'failures': failures,
+        }, file, indent=4)
+    return 1 if regressions or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,57 @@
+import argparse
+
 import pygame
 
 from src.game import Game
+from src.network import ZeppelinServer, parse_address
+from src import recording
+from src.scenario import Scenario
 
 CAPTION = "Urantia"
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Zeppelin cockpit simulator")
+    parser.add_argument('--profile', action='store_true', help="show frame timings on screen, dump them with 'p'")
+    parser.add_argument(
+        '--renderer', choices=['software', 'sdl2'], default='software',
+        help="draw with software blits, or with the textures of the SDL2 renderer"
+    )
+    parser.add_argument(
+        '--threaded', action='store_true', help="update the zeppelin on a separate thread, at a fixed rate"
+    )
+    parser.add_argument(
+        '--server', nargs='?', const='', metavar='HOST[:PORT]',
+        help="run only the simulation, serving its state to the stations"
+    )
+    parser.add_argument(
+        '--connect', metavar='HOST[:PORT]', help="show the zeppelin simulated by the server, instead of simulating it"
+    )
+    parser.add_argument('--record', metavar='FILE', help="log the inputs of the game, to replay it later")
+    parser.add_argument('--replay', metavar='FILE', help="replay the logged game headless, as fast as possible")
+    parser.add_argument('--scenario', metavar='FILE', help="play the scenario of timed and conditional events")
+    args = parser.parse_args()
+    scenario = Scenario.load(args.scenario) if args.scenario is not None else None
+
+    if args.replay is not None:
+        recording.main(args.replay, scenario)
+        return
+
+    if args.server is not None:
+        try:
+            ZeppelinServer(*parse_address(args.server), scenario=scenario).run()
+        except KeyboardInterrupt:
+            pass
+        return
+
     pygame.init()
     pygame.display.set_caption(CAPTION)
-    game = Game()
+    game = Game(
+        profile=args.profile, renderer=args.renderer, threaded=args.threaded,
+        address=parse_address(args.connect) if args.connect is not None else None,
+        record=args.record,
+        scenario=scenario
+    )
     game.run()
     pygame.quit()
 
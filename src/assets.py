@@ -1,15 +1,41 @@
+import os
+import time
+
 import pygame
 
+from src.bundle import AssetBundle, is_display_format
+
 IMAGES_PATH = 'assets/images/'
 SOUNDS_PATH = 'assets/sounds/'
+FONTS_PATH = 'assets/fonts/'
+
+LABEL_FONT = 'victorianparlorvintagealternate'
+LABEL_COLOUR = (0, 0, 0)
+
+PARAMETER_SOUND_FILES = {
+    'pressure_change': 'diffuser.ogg',
+    'engine_power': 'engine.ogg',
+    'velocity': 'cabin.ogg',
+}
+OTHER_SOUND_FILES = {
+    'crash': 'crash.wav'
+}
 
 
 class AssetLibrary:
-    """Object responsible for loading image assets"""
+    """
+    Object responsible for loading image assets
+    Every image is loaded, scaled and converted to the display format only once, and shared between devices
+    Images are taken from the packed asset bundle if it is built, decoding the files is the fallback
+    """
     def __init__(self):
+        self.bundle = AssetBundle.open()
+        # Loaded images keyed by asset name and scale, with the time their loading took
+        self.images = {}
+        self.load_times = {}
+        self.unconverted = set()
         self.asset_dict = {
             'background': 'background_bronze.jpg',
-            'speedometer': 'speedometer.png',
             'clock_hand': 'clock_hand.png',
             'indicator_background': 'indicator_panel.png',
             'indicator_hand': 'indicator_hand.png',
@@ -23,17 +49,101 @@ class AssetLibrary:
             'turn_hand': 'turn_indicator_hand.png'
         }
 
-    def load_image(self, asset_name):
-        return pygame.image.load(IMAGES_PATH + self.asset_dict[asset_name])
+    def load_sound(self, filename):
+        """Return the sound, with its decoded samples taken from the bundle if possible"""
+        sound = self.bundle.sound(SOUNDS_PATH + filename) if self.bundle else None
+        if sound is None:
+            sound = pygame.mixer.Sound(SOUNDS_PATH + filename)
+        return sound
+
+    def load_image(self, asset_name, scale=1):
+        """Return the image, scaled images are smoothscaled from the cached original"""
+        key = asset_name, scale
+        if key not in self.images:
+            start = time.perf_counter()
+            if scale == 1:
+                image = self.bundle.image(IMAGES_PATH + self.asset_dict[asset_name]) if self.bundle else None
+                if image is None:
+                    image = pygame.image.load(IMAGES_PATH + self.asset_dict[asset_name])
+            else:
+                image = self.load_image(asset_name)
+                size = round(image.get_width() * scale), round(image.get_height() * scale)
+                image = pygame.transform.smoothscale(image, size)
+            self.images[key] = image
+            self.unconverted.add(key)
+            self.convert_images()
+            self.load_times[key] = time.perf_counter() - start
+        return self.images[key]
+
+    def convert_images(self):
+        """Convert the loaded images to the display pixel format, possible only once the display mode is set"""
+        if pygame.display.get_surface() is None:
+            return
+        for key in self.unconverted:
+            image = self.images[key]
+            if image.get_flags() & pygame.SRCALPHA and is_display_format(image):
+                # Bundled images already have the display format, they keep sharing the mapped pixels
+                continue
+            if image.get_flags() & pygame.SRCALPHA:
+                self.images[key] = image.convert_alpha()
+            else:
+                self.images[key] = image.convert()
+        self.unconverted.clear()
+
+    def preload(self, scale=1):
+        """Load all images for the given scale at once, return the loading times of the images in seconds"""
+        for asset_name in self.asset_dict:
+            self.load_image(asset_name, scale)
+        return {key: seconds for key, seconds in self.load_times.items() if key[1] == scale}
 
 
 assets = AssetLibrary()
 
 
+class FontLibrary:
+    """
+    Object responsible for resolving fonts once per process and caching rendered texts
+    A font file bundled in FONTS_PATH is preferred over looking up the system fonts
+    """
+    def __init__(self):
+        # Font files resolved by name, None meaning the pygame default font
+        self.paths = {}
+        self.fonts = {}
+        self.texts = {}
+
+    def resolve(self, name):
+        """Return the path of the font file for the font name, looked up only once"""
+        if name not in self.paths:
+            bundled_path = FONTS_PATH + '{}.ttf'.format(name)
+            if name is None:
+                self.paths[name] = None
+            elif os.path.exists(bundled_path):
+                self.paths[name] = bundled_path
+            else:
+                self.paths[name] = pygame.font.match_font(name)
+        return self.paths[name]
+
+    def get_font(self, name, size):
+        key = name, size
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(self.resolve(name), size)
+        return self.fonts[key]
+
+    def render(self, text, size, colour=LABEL_COLOUR, name=LABEL_FONT):
+        """Return the antialiased text surface, rendered once for every font, size, text and colour"""
+        key = name, size, text, tuple(colour)
+        if key not in self.texts:
+            self.texts[key] = self.get_font(name, size).render(text, True, colour)
+        return self.texts[key]
+
+
+fonts = FontLibrary()
+
+
 class Sound:
     """Single played sound"""
     def __init__(self, filename):
-        self.file = pygame.mixer.Sound(SOUNDS_PATH + filename)
+        self.file = assets.load_sound(filename)
         self.playing = False
 
     def start_playing(self):
@@ -70,14 +180,8 @@ class ParameterSound(Sound):
 class SoundController:
     """Object responsible for managing sounds in the gamme"""
     def __init__(self, zeppelin):
-        self.parameter_sound_files = {
-            'pressure_change': 'diffuser.ogg',
-            'engine_power': 'engine.ogg',
-            'velocity': 'cabin.ogg',
-        }
-        self.other_sounds = {
-            'crash': 'crash.wav'
-        }
+        self.parameter_sound_files = PARAMETER_SOUND_FILES
+        self.other_sounds = OTHER_SOUND_FILES
         self.zeppelin = zeppelin
         self.parameter_sounds = {}
         self.sounds = {}
@@ -86,10 +190,13 @@ class SoundController:
         for name, filename in self.other_sounds.items():
             self.sounds[name] = Sound(filename)
 
-    def update_sounds(self):
-        """Update all parameter sounds"""
+    def update_sounds(self, values=None):
+        """
+        Update all parameter sounds
+        Values of the parameters may be given explicitly, by default the current zeppelin values are played
+        """
         for parameter, sound in self.parameter_sounds.items():
-            value = abs(self.zeppelin.get_parameter(parameter))
+            value = abs(values[parameter] if values is not None else self.zeppelin.get_parameter(parameter))
             if not value:
                 if sound.playing:
                     sound.stop_playing()
@@ -98,6 +205,13 @@ class SoundController:
                 if not sound.playing:
                     sound.start_playing()
 
+    def reset(self, zeppelin):
+        """Silence all sounds and follow a new zeppelin"""
+        for sound in list(self.parameter_sounds.values()) + list(self.sounds.values()):
+            if sound.playing:
+                sound.stop_playing()
+        self.zeppelin = zeppelin
+
     def crash_sound(self):
         """Play a crash sound when zeppelin crashes"""
         for parameter, sound in self.parameter_sounds.items():
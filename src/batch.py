@@ -0,0 +1,273 @@
+import numpy as np
+
+from src import const
+from src.const import TICK_MILLISECONDS
+from src.parameters import PARAMETERS
+
+# Parameters stored by the batch, coordinates are kept separately as x and y
+BATCH_PARAMETERS = [
+    'pressure', 'height', 'destined_height', 'engine_power', 'acceleration', 'destined_velocity', 'velocity',
+    'fuel_consumption', 'fuel', 'turn', 'angular_velocity', 'direction', 'pressure_change',
+]
+# Parameters with snapping to the given value, mirroring Zeppelin
+SNAPPED_PARAMETERS = {
+    'engine_power': 0,
+    'angular_velocity': 0,
+}
+# Constants from src.const that may be overridden for each zeppelin
+CONSTANTS = [
+    'ACCELERATION_DIVIDER', 'DECELERATION_LIMIT', 'HEIGHT_CHANGE_DIVIDER', 'MINIMAL_STEP',
+    'ACCELERATION_MODIFIER_DIVIDER', 'DECELERATION_MODIFIER_DIVIDER', 'PRESSURE_DIVIDER_MODIFIER',
+]
+
+
+class BatchZeppelins:
+    """
+    Many zeppelins stepped at once as NumPy arrays, following the same rules as Zeppelin.update_values
+    Constants and parameter ranges can be given per zeppelin, as scalars or arrays, to sweep parameter spaces
+    """
+    def __init__(self, count, constants=None, ranges=None, initial_values=None):
+        self.count = count
+        constants = constants or {}
+        ranges = ranges or {}
+        initial_values = initial_values or {}
+
+        self.constants = {}
+        for name in CONSTANTS:
+            self.constants[name] = self.column(constants.get(name, getattr(const, name)))
+        self.max_height_step = self.column(constants.get('max_step', PARAMETERS['height']['max_step']))
+        self.fuel_consumption_step = self.column(constants.get('step', PARAMETERS['fuel_consumption']['step']))
+
+        self.min_values = {}
+        self.max_values = {}
+        self.values = {}
+        for parameter in BATCH_PARAMETERS:
+            data = PARAMETERS[parameter]
+            min_value, max_value = ranges.get(parameter, (data['min_value'], data['max_value']))
+            self.min_values[parameter] = self.column(min_value)
+            self.max_values[parameter] = self.column(max_value)
+            self.values[parameter] = self.column(initial_values.get(parameter, data['initial_value']))
+        # Velocity and pressure_change can have negative values, like TurnedParameter
+        for parameter in ['velocity', 'pressure_change']:
+            self.min_values[parameter] = -self.max_values[parameter]
+        self.initial_pressure = self.column(initial_values.get('pressure', PARAMETERS['pressure']['initial_value']))
+
+        x, y = initial_values.get('coordinates', PARAMETERS['coordinates']['initial_value'])
+        self.x = self.column(x)
+        self.y = self.column(y)
+
+        self.pressure_cache = self.values['pressure'].copy()
+        self.engine_cache = self.values['engine_power'].copy()
+        self.fuel_consumption_cache = self.column(0)
+        self.distance_travelled = self.column(0)
+        self.velocity_difference = self.column(0)
+        self.crashed = np.zeros(count, dtype=bool)
+        self.crash_tick = np.full(count, -1)
+        self.ticks = 0
+
+    def column(self, value):
+        """Return a float array of the batch size filled with the value, or a copy of the given array"""
+        return np.array(np.broadcast_to(np.asarray(value, dtype=float), (self.count,)))
+
+    def get_parameter(self, parameter):
+        """Return the values of the parameter as the zeppelins report them"""
+        if parameter == 'coordinates':
+            return np.stack([self.x, self.y], axis=1)
+        if parameter in ['velocity', 'pressure_change']:
+            return np.abs(self.values[parameter])
+        return self.values[parameter]
+
+    def set_parameter(self, parameter, value, mask=True):
+        """Set the values of the parameter so that they fit in its range limits"""
+        value = np.asarray(value, dtype=float)
+        if parameter == 'direction':
+            value = np.mod(value, self.max_values['direction'])
+            value = np.where(value >= self.max_values['direction'], 0, value)
+        else:
+            value = np.clip(value, self.min_values[parameter], self.max_values[parameter])
+        self.values[parameter] = np.where(mask, value, self.values[parameter])
+
+    def change_parameter(self, parameter, value, hard=False, mask=True):
+        """Increase the values of the parameter, with snapping and crash control like in Zeppelin"""
+        value = np.broadcast_to(np.asarray(value, dtype=float), (self.count,))
+        mask = np.broadcast_to(mask, (self.count,)) & ~self.crashed
+        if parameter in SNAPPED_PARAMETERS and not hard:
+            mask = mask & (self.values[parameter] != SNAPPED_PARAMETERS[parameter])
+        if parameter == 'height':
+            height = self.values['height']
+            crash = (height != self.min_values['height']) & (height + value <= self.min_values['height']) & (value <= -5)
+            self.crash(mask & crash)
+        self.set_parameter(parameter, self.values[parameter] + value, mask)
+
+    def crash(self, mask):
+        """Mark the zeppelins as crashed, remembering the tick of the crash"""
+        self.crash_tick = np.where(mask & ~self.crashed, self.ticks, self.crash_tick)
+        self.crashed = self.crashed | mask
+
+    def is_accelerating(self):
+        """Check which zeppelins are currently actively increasing their velocity"""
+        v = self.values['velocity']
+        dv = self.values['destined_velocity']
+        return (dv != 0) & ((v * dv < 0) | (np.abs(dv) > np.abs(v)))
+
+    def get_acceleration(self):
+        """Return the acceleration values that emerge from the current velocity difference"""
+        c = self.constants
+        v = self.values['velocity']
+        dv = self.values['destined_velocity']
+        lambda_turn = np.sign(dv - v)
+        deceleration = lambda_turn * np.minimum(
+            np.abs(self.velocity_difference) / c['ACCELERATION_DIVIDER'] / 3,
+            c['DECELERATION_LIMIT']
+        )
+        acceleration = np.where(
+            lambda_turn > 0,
+            self.velocity_difference / c['ACCELERATION_DIVIDER'],
+            self.velocity_difference / c['ACCELERATION_DIVIDER'] / 3
+        )
+        return np.where(self.is_accelerating(), acceleration, deceleration)
+
+    def calculate_fuel_consumption(self):
+        """Calculate the current fuel consumption based on engine power, acceleration and pressure change"""
+        c = self.constants
+        power = np.abs(self.values['engine_power'])
+        consumption = np.where(power == 0, 0, (power - 50) ** 2 / 125 + 10)
+        consumption = consumption + np.where(
+            self.is_accelerating(),
+            np.abs(self.velocity_difference) / c['ACCELERATION_MODIFIER_DIVIDER'],
+            -np.abs(self.velocity_difference) / c['DECELERATION_MODIFIER_DIVIDER']
+        )
+        consumption = consumption + np.abs(self.values['pressure_change']) / c['PRESSURE_DIVIDER_MODIFIER']
+        return np.clip(
+            consumption,
+            self.fuel_consumption_cache - self.fuel_consumption_step,
+            self.fuel_consumption_cache + self.fuel_consumption_step
+        )
+
+    def turn_off_engine(self, mask):
+        """Slow the engines down, for zeppelins without fuel"""
+        self.set_parameter('pressure', self.pressure_cache, mask)
+        power = self.values['engine_power']
+        self.set_parameter('engine_power', np.where(power > 5, power - 5, np.where(power < -5, power + 5, 0)), mask)
+
+    def update_values(self, milliseconds=TICK_MILLISECONDS):
+        """Update all the zeppelins by a single tick, crashed zeppelins stay frozen"""
+        c = self.constants
+        active = ~self.crashed
+        values = self.values
+
+        # If no fuel, turn off the engine
+        self.turn_off_engine(active & (values['fuel'] == 0))
+
+        # If pressure has changed, update destined_height
+        self.set_parameter('pressure_change', np.abs(self.pressure_cache - values['pressure']), active)
+        pressure_changed = active & (values['pressure_change'] != 0)
+        self.pressure_cache = np.where(pressure_changed, values['pressure'], self.pressure_cache)
+        self.set_parameter('destined_height', self.initial_pressure - values['pressure'], pressure_changed)
+
+        # If height != destined_height, update height
+        height_difference = values['destined_height'] - values['height']
+        height_changing = active & (height_difference != 0)
+        minimal = np.abs(height_difference) < c['MINIMAL_STEP']
+        self.set_parameter('height', values['destined_height'], height_changing & minimal)
+        self.change_parameter(
+            'height',
+            np.minimum(height_difference / c['HEIGHT_CHANGE_DIVIDER'], self.max_height_step),
+            mask=height_changing & ~minimal
+        )
+        grounded = height_changing & (values['height'] == self.min_values['height'])
+        self.set_parameter('destined_height', values['height'], grounded)
+
+        # If engine_power has changed, update destined_velocity
+        engine_changed = active & (self.engine_cache != values['engine_power'])
+        self.engine_cache = np.where(engine_changed, values['engine_power'], self.engine_cache)
+        self.set_parameter('destined_velocity', values['engine_power'], engine_changed)
+
+        # If velocity != destined_velocity, update velocity and turn
+        self.velocity_difference = np.where(
+            active, values['destined_velocity'] - values['velocity'], self.velocity_difference
+        )
+        velocity_changing = active & (self.velocity_difference != 0)
+        minimal = np.abs(self.velocity_difference) < c['MINIMAL_STEP']
+        self.set_parameter('velocity', values['destined_velocity'], velocity_changing & minimal)
+        accelerating = velocity_changing & ~minimal
+        self.set_parameter('acceleration', self.get_acceleration(), accelerating)
+        self.set_parameter('velocity', values['velocity'] + values['acceleration'], accelerating)
+        self.set_parameter('turn', np.sign(values['velocity']), velocity_changing)
+
+        # Update direction based on angular_velocity and velocity
+        self.set_parameter(
+            'direction',
+            values['direction'] + values['angular_velocity'] * values['velocity'] / 500,
+            active & (values['angular_velocity'] != 0)
+        )
+
+        # Calculate fuel consumption
+        self.fuel_consumption_cache = np.where(active, self.calculate_fuel_consumption(), self.fuel_consumption_cache)
+        self.set_parameter('fuel_consumption', self.fuel_consumption_cache, active)
+
+        # Calculate the distance
+        distance = np.where(active, np.abs(values['velocity']) * milliseconds / 1000 / 3600, 0)
+        self.distance_travelled += distance
+        angle = np.radians(values['direction'])
+        self.x += np.sin(angle) * distance
+        self.y -= np.cos(angle) * distance
+
+        # Calculate how much fuel has been consumed during last tick
+        self.set_parameter('fuel', values['fuel'] - distance * values['fuel_consumption'] / 10, active)
+
+        self.ticks += 1
+
+    def run(self, ticks, script=None, milliseconds=TICK_MILLISECONDS, until=None):
+        """
+        Step the zeppelins by the given number of ticks
+        The script is called with the tick number and the batch before each tick, to apply the control inputs
+        The run stops early when the until function returns True for the batch
+        """
+        for tick in range(ticks):
+            if until is not None and until(self):
+                break
+            if script is not None:
+                script(tick, self)
+            self.update_values(milliseconds)
+        return self
+
+
+class ScriptedInputs:
+    """
+    Control inputs imitating held keys
+    Each entry is a tuple of (first_tick, last_tick, parameter, step), the first tick is processed with hard=True
+    Steps may be arrays, giving a different input for each zeppelin
+    """
+    def __init__(self, entries):
+        self.entries = entries
+
+    def __call__(self, tick, batch):
+        for first_tick, last_tick, parameter, step in self.entries:
+            if first_tick <= tick < last_tick:
+                batch.change_parameter(parameter, step, hard=tick == first_tick)
+
+
+def fuel_range_by_engine_power(engine_powers, max_ticks=None, milliseconds=TICK_MILLISECONDS, **kwargs):
+    """
+    Return the distance travelled on a full tank of fuel by zeppelins with the given constant engine powers
+    The zeppelins fly until all of them have run out of fuel and stopped, or have crashed,
+    a ValueError is raised when any of them is still flying after the given maximal number of ticks
+    """
+    engine_powers = np.asarray(engine_powers, dtype=float)
+    batch = BatchZeppelins(len(engine_powers), **kwargs)
+    batch.change_parameter('engine_power', engine_powers, hard=True)
+
+    def stopped(b):
+        # Zeppelins without engine power from the start don't move, so they are done with all their fuel left
+        return (b.values['engine_power'] == 0) & (b.values['velocity'] == 0) | b.crashed
+
+    ticks = 0
+    while not np.all(stopped(batch)):
+        if max_ticks is not None and ticks >= max_ticks:
+            raise ValueError("{} zeppelins are still flying after {} ticks".format(
+                np.count_nonzero(~stopped(batch)), max_ticks
+            ))
+        batch.update_values(milliseconds)
+        ticks += 1
+    return batch.distance_travelled
@@ -0,0 +1,66 @@
+import pygame
+
+from src.devices import LevelIndicator, Gauge, Compass, HorizontalSnapIndicator, TurnIndicator
+
+# User interface attached to the simulation parameters defined in src.parameters
+
+DEVICES = {
+    'height': {
+        'class': LevelIndicator,
+        'coordinates': (100, 50),
+    },
+    'pressure': {
+        'class': Gauge,
+        'coordinates': (50, 900),
+    },
+    'engine_power': {
+        'class': HorizontalSnapIndicator,
+        'coordinates': (700, 1100),
+    },
+    'velocity': {
+        'class': Gauge,
+        'coordinates': (400, 250),
+    },
+    'fuel_consumption': {
+        'class': Gauge,
+        'coordinates': (850, 500),
+    },
+    'fuel': {
+        'class': LevelIndicator,
+        'coordinates': (1300, 50),
+    },
+    'turn': {
+        'class': TurnIndicator,
+        'coordinates': (1900, 900),
+    },
+    'angular_velocity': {
+        'class': HorizontalSnapIndicator,
+        'coordinates': (1600, 700),
+    },
+    'direction': {
+        'class': Compass,
+        'coordinates': (1820, 200),
+    },
+    'port_distance': {
+        'class': Gauge,
+        'coordinates': (2100, 900),
+    },
+}
+
+CONTROLLERS = {
+    'pressure': {
+        'step': 10,
+        'increase': pygame.K_w,
+        'decrease': pygame.K_z,
+    },
+    'engine_power': {
+        'step': 1,
+        'increase': pygame.K_k,
+        'decrease': pygame.K_h,
+    },
+    'angular_velocity': {
+        'step': 1,
+        'increase': pygame.K_RIGHT,
+        'decrease': pygame.K_LEFT,
+    },
+}
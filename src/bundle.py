@@ -0,0 +1,140 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+BUNDLE_PATH = 'assets/bundle.bin'
+MAGIC = b'URANTIA1'
+# Raw pixels with alpha are stored in the memory order of the 32-bit display format,
+# opaque ones are converted to the display format once loaded anyway
+ALPHA_PIXEL_FORMAT = 'BGRA'
+OPAQUE_PIXEL_FORMAT = 'RGB'
+ALIGNMENT = 64
+
+
+class AssetBundle:
+    """
+    Single file of raw image pixels and decoded sound samples, memory-mapped instead of decoding every file
+    Assets whose source files have changed since the bundle was built are not served from it
+    """
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        # Copy-on-write mapping, pages are copied only if a surface created from them is ever drawn on
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not an asset bundle".format(path))
+        header_length, = struct.unpack_from('<I', self.data, len(MAGIC))
+        self.header = json.loads(self.data[len(MAGIC) + 4:len(MAGIC) + 4 + header_length].decode())
+        self.data_start = data_start(header_length)
+
+    @classmethod
+    def open(cls, path=BUNDLE_PATH):
+        """Return the bundle at the path, or None if there is no valid bundle"""
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def source_stamp(path):
+        stat = os.stat(path)
+        return [stat.st_size, int(stat.st_mtime)]
+
+    def is_fresh(self, entry, path):
+        return os.path.exists(path) and entry['source'] == self.source_stamp(path)
+
+    def buffer(self, entry):
+        start = self.data_start + entry['offset']
+        return memoryview(self.data)[start:start + entry['length']]
+
+    def image(self, path):
+        """Return a surface sharing the mapped pixels of the image, or None if it is not bundled"""
+        entry = self.header['images'].get(path)
+        if entry is None or not self.is_fresh(entry, path):
+            return None
+        return pygame.image.frombuffer(self.buffer(entry), entry['size'], entry['format'])
+
+    def sound(self, path):
+        """Return the sound made of the decoded samples, or None if they don't match the mixer format"""
+        entry = self.header['sounds'].get(path)
+        mixer = pygame.mixer.get_init()
+        if entry is None or not self.is_fresh(entry, path) or mixer is None or list(mixer) != entry['mixer']:
+            return None
+        return pygame.mixer.Sound(buffer=self.buffer(entry))
+
+
+def data_start(header_length):
+    """Return the aligned position of the data section, following the header"""
+    position = len(MAGIC) + 4 + header_length
+    return position + (-position) % ALIGNMENT
+
+
+def is_display_format(image):
+    """Check if the image already has the pixel format that convert_alpha would give it"""
+    probe = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
+    return image.get_bitsize() == probe.get_bitsize() and image.get_masks() == probe.get_masks()
+
+
+def build_bundle(image_paths, sound_paths, path=BUNDLE_PATH):
+    """
+    Decode all images and sounds and write them into a single bundle file
+    Offsets in the header are relative to the aligned data section
+    """
+    header = {'images': {}, 'sounds': {}}
+    blobs = []
+    offset = 0
+
+    def add(blob):
+        nonlocal offset
+        blobs.append((offset, blob))
+        entry = {'offset': offset, 'length': len(blob)}
+        offset += len(blob) + (-len(blob)) % ALIGNMENT
+        return entry
+
+    for image_path in image_paths:
+        image = pygame.image.load(image_path)
+        pixel_format = ALPHA_PIXEL_FORMAT if image.get_flags() & pygame.SRCALPHA else OPAQUE_PIXEL_FORMAT
+        entry = add(pygame.image.tobytes(image, pixel_format))
+        entry.update(
+            size=list(image.get_size()),
+            format=pixel_format,
+            source=AssetBundle.source_stamp(image_path)
+        )
+        header['images'][image_path] = entry
+    for sound_path in sound_paths:
+        sound = pygame.mixer.Sound(sound_path)
+        entry = add(sound.get_raw())
+        entry.update(mixer=list(pygame.mixer.get_init()), source=AssetBundle.source_stamp(sound_path))
+        header['sounds'][sound_path] = entry
+
+    encoded_header = json.dumps(header).encode()
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(struct.pack('<I', len(encoded_header)))
+        file.write(encoded_header)
+        start = data_start(len(encoded_header))
+        for blob_offset, blob in blobs:
+            file.write(b'\0' * (start + blob_offset - file.tell()))
+            file.write(blob)
+    return path
+
+
+def main():
+    """Build the bundle of all game assets, run from the repository root: python -m src.bundle"""
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.mixer.init()
+    from src.assets import assets, IMAGES_PATH, SOUNDS_PATH, PARAMETER_SOUND_FILES, OTHER_SOUND_FILES
+    image_paths = sorted({IMAGES_PATH + filename for filename in assets.asset_dict.values()})
+    sound_files = list(PARAMETER_SOUND_FILES.values()) + list(OTHER_SOUND_FILES.values())
+    sound_paths = sorted({SOUNDS_PATH + filename for filename in sound_files})
+    path = build_bundle(image_paths, sound_paths, sys.argv[1] if len(sys.argv) > 1 else BUNDLE_PATH)
+    print('Bundled {} images and {} sounds into {}'.format(len(image_paths), len(sound_paths), path))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,7 @@
+# Simulation is stepped with a fixed timestep, independent of the frame rate
+TICK_MILLISECONDS = 1000 / 60
+MAX_TICKS_PER_FRAME = 10
+
 ACCELERATION_DIVIDER = 20
 DECELERATION_LIMIT = 0.5
 HEIGHT_CHANGE_DIVIDER = 20
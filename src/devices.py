@@ -1,41 +1,145 @@
 import pygame
 
-from src.assets import assets
-from src.utils import rotate_vector
+from src.assets import assets, fonts
+from src.mapping import ValueMapping
+from src.rotation import rotations
 
 
 class Device:
-    """Interface for all devices"""
-    def __init__(self, values_range, coordinates, initial_value):
+    """
+    Interface for all devices
+    Pixel constants of devices are given for the 2560x1440 layout, and multiplied by the scale of the screen layout
+    """
+    def __init__(self, values_range, coordinates, initial_value, scale=1):
         # Set border values
         self.min_value = values_range[0]
         self.max_value = values_range[1]
 
-        # Initialize value
+        # Initialize value, its hand state is known once the subclass initializes the mapping
         self.value = initial_value
+        self.mapping = None
+        self.state = None
 
-        # Save background position
+        # Save background position and the layout scale
         self.coordinates = coordinates
+        self.scale = scale
+
+        # Layers are composited once the screen backdrop is known
+        self.static_layer = None
+
+        # Hand last drawn directly onto the screen
+        self.screen_hand_rect = None
+        self.rendered_state = None
+
+    def initialize_mapping(self, screen_range, quantise):
+        """Map the values range onto the screen range of the value indicator, called once by the subclass"""
+        self.mapping = ValueMapping((self.min_value, self.max_value), screen_range, quantise)
+        self.update(self.value)
 
     def update(self, value):
-        """Set a new value for the device, so that it fits in the values range"""
+        """Set a new value for the device, so that it fits in the values range, and look up its hand state"""
         if value > self.max_value:
             self.value = self.max_value
         elif value < self.min_value:
             self.value = self.min_value
         else:
             self.value = value
+        self.state = self.mapping.state(self.value)
+
+    def pixel(self, position):
+        """Quantise a position of a sliding hand into whole pixels of the scaled layout"""
+        return int(position * self.scale)
 
     @property
     def position(self):
         """Return the coordinates of the ultimate device image device"""
         return self.coordinates
 
-    @property
-    def image(self):
-        """Return the ultimate image of the device, with the value indicator in the right position"""
+    def initialize_layers(self, backdrop):
+        """
+        Composite the screen backdrop, the background and the labels once into a display-format static layer
+        Called only once, after the display is created
+        """
+        size = self.bg_image.get_size()
+        self.static_layer = pygame.Surface(size)
+        # Texture renderers have no display surface to convert to
+        if pygame.display.get_surface() is not None:
+            self.static_layer = self.static_layer.convert()
+        self.static_layer.blit(backdrop, (0, 0), pygame.Rect(self.coordinates, size))
+        self.static_layer.blit(self.bg_image, (0, 0))
+        self.blit_labels(self.static_layer)
+        self.invalidate()
+
+    def invalidate(self):
+        """Force the device to be rendered again, even if its value has not changed"""
+        self.rendered_state = None
+
+    def blit_labels(self, image):
+        """Blit the labels onto the background image, devices without labels leave it untouched"""
+        return image
+
+    def hand_state(self):
+        """Return the quantised position of the value indicator, values with equal states look the same"""
+        return self.state
+
+    def hand(self):
+        """Return the image of the value indicator and the coordinates on which it has to be blitted"""
         raise NotImplementedError
 
+    def hand_pose(self):
+        """
+        Return the unrotated image of the value indicator, its coordinates, the rotation angle and origin
+        Used by renderers transforming the images themselves, devices with sliding hands don't rotate them
+        """
+        hand_image, coordinates = self.hand()
+        return hand_image, coordinates, 0, None
+
+    @property
+    def changed(self):
+        """Check if the value indicator has moved since it was last drawn on the screen"""
+        return self.state != self.rendered_state
+
+    @property
+    def rect(self):
+        """Return the screen rect of the device"""
+        return pygame.Rect(self.coordinates, self.static_layer.get_size())
+
+    def draw(self, screen):
+        """
+        Draw the device directly onto the screen, if its value indicator has moved
+        Only the union of the previous and the new hand boxes is restored from the static layer
+        Return the list of screen rects that have changed
+        """
+        state = self.state
+        if state == self.rendered_state:
+            return []
+
+        device_rect = self.rect
+        hand_image, hand_coordinates = self.hand()
+        # Whole pixels, so that the recorded hand box covers exactly the pixels blitted, blit truncates as int does
+        hand_position = (
+            int(self.coordinates[0] + hand_coordinates[0]),
+            int(self.coordinates[1] + hand_coordinates[1])
+        )
+        hand_rect = hand_image.get_rect(topleft=hand_position).clip(device_rect)
+        if self.rendered_state is None or self.screen_hand_rect is None:
+            dirty_rects = [device_rect]
+        elif self.screen_hand_rect.colliderect(hand_rect):
+            dirty_rects = [self.screen_hand_rect.union(hand_rect)]
+        else:
+            dirty_rects = [self.screen_hand_rect, hand_rect]
+
+        for rect in dirty_rects:
+            screen.blit(self.static_layer, rect, rect.move(-self.coordinates[0], -self.coordinates[1]))
+        clip = screen.get_clip()
+        screen.set_clip(device_rect)
+        screen.blit(hand_image, hand_position)
+        screen.set_clip(clip)
+
+        self.screen_hand_rect = hand_rect
+        self.rendered_state = state
+        return dirty_rects
+
 
 class LevelIndicator(Device):
     """
@@ -50,73 +154,42 @@ class LevelIndicator(Device):
     LABEL_MAX_Y = 33
     LABEL_MIN_Y = 750
 
-    def __init__(self, values_range, coordinates, initial_value):
-        super().__init__(values_range, coordinates, initial_value)
+    def __init__(self, values_range, coordinates, initial_value, scale=1):
+        super().__init__(values_range, coordinates, initial_value, scale)
         
         # Load images
-        self.bg_image = assets.load_image('indicator_background')
-        self.hand_image = assets.load_image('indicator_hand')
+        self.bg_image = assets.load_image('indicator_background', scale)
+        self.hand_image = assets.load_image('indicator_hand', scale)
 
+        self.initialize_mapping((self.HAND_MIN_Y_LAMBDA, self.HAND_MAX_Y_LAMBDA), self.pixel)
+        self.label_mapping = ValueMapping((self.min_value, self.max_value), (self.LABEL_MIN_Y, self.LABEL_MAX_Y))
         self.labels = self.generate_labels()
 
-    def hand_y_pos(self):
-        """Return y coordinate of the hand, calculated from its value"""
-        if self.value == self.min_value:
-            return self.HAND_MIN_Y_LAMBDA
-        if self.value == self.max_value:
-            return self.HAND_MAX_Y_LAMBDA
-
-        # The below calculation bases on proportion
-        full_y_range = self.HAND_MAX_Y_LAMBDA - self.HAND_MIN_Y_LAMBDA
-        full_value_range = self.max_value - self.min_value
-        current_value_lambda = self.value - self.min_value
-
-        # current_value_lambda / full_value_range = current_y_lambda / full_y_range
-        return (full_y_range * current_value_lambda / full_value_range) + self.HAND_MIN_Y_LAMBDA
-
-    def hand_position(self):
-        """Returns a tuple of (x, y) coordinates of the hand"""
-        return self.HAND_X_LAMBDA, self.hand_y_pos()
-
     def generate_labels(self):
         """Function to generate list of value labels, called only once by the init finction"""
-        font = pygame.font.SysFont("victorianparlorvintagealternate", 30)
+        font_size = round(30 * self.scale)
         labels = []
         for label_number in range(self.LABELS_COUNT):
             full_range = self.max_value - self.min_value
             value = int(self.min_value + full_range / (self.LABELS_COUNT - 1) * label_number)
-            y_pos = self.label_y_pos(value)
+            y_pos = self.label_mapping.position(value)
             labels.append((
-                font.render(str(value), True, (0, 0, 0)),
+                fonts.render(str(value), font_size),
                 (
-                    self.LABEL_X,
-                    y_pos
+                    self.LABEL_X * self.scale,
+                    y_pos * self.scale
                 )
             ))
         return labels
 
-    def label_y_pos(self, value):
-        """Return y coordinate of a label, calculated from its value"""
-        full_y_range = self.LABEL_MAX_Y - self.LABEL_MIN_Y
-        full_value_range = self.max_value - self.min_value
-        current_value_lambda = value - self.min_value
-
-        # current_value_lambda / full_value_range = current_y_lambda / full_y_range
-        return (full_y_range * current_value_lambda / full_value_range) + self.LABEL_MIN_Y
-
     def blit_labels(self, image):
         """Blit the labels onto the background image"""
         for label in self.labels:
             image.blit(*label)
         return image
 
-    @property
-    def image(self):
-        """Return the ultimate image of the device, with the value indicator in the right position"""
-        image = self.bg_image.copy()
-        image = self.blit_labels(image)
-        image.blit(self.hand_image, self.hand_position())
-        return image
+    def hand(self):
+        return self.hand_image, (self.pixel(self.HAND_X_LAMBDA), self.state)
 
 
 class HorizontalSnapIndicator(Device):
@@ -128,38 +201,17 @@ class HorizontalSnapIndicator(Device):
     HAND_MAX_X_LAMBDA = 769
     HAND_MIN_X_LAMBDA = 27
 
-    def __init__(self, values_range, coordinates, initial_value):
-        super().__init__(values_range, coordinates, initial_value)
+    def __init__(self, values_range, coordinates, initial_value, scale=1):
+        super().__init__(values_range, coordinates, initial_value, scale)
 
         # Load images
-        self.bg_image = assets.load_image('horizontal_background')
-        self.hand_image = assets.load_image('horizontal_hand')
-
-    def hand_x_pos(self):
-        """Return y coordinate of the hand, calculated from its value"""
-        if self.value == self.min_value:
-            return self.HAND_MIN_X_LAMBDA
-        if self.value == self.max_value:
-            return self.HAND_MAX_X_LAMBDA
+        self.bg_image = assets.load_image('horizontal_background', scale)
+        self.hand_image = assets.load_image('horizontal_hand', scale)
 
-        # The below calculation bases on proportion
-        full_y_range = self.HAND_MAX_X_LAMBDA - self.HAND_MIN_X_LAMBDA
-        full_value_range = self.max_value - self.min_value
-        current_value_lambda = self.value - self.min_value
+        self.initialize_mapping((self.HAND_MIN_X_LAMBDA, self.HAND_MAX_X_LAMBDA), self.pixel)
 
-        # current_value_lambda / full_value_range = current_y_lambda / full_y_range
-        return (full_y_range * current_value_lambda / full_value_range) + self.HAND_MIN_X_LAMBDA
-
-    def hand_position(self):
-        """Return a tuple of (x, y) coordinates of the hand"""
-        return self.hand_x_pos(), self.HAND_Y_LAMBDA
-
-    @property
-    def image(self):
-        """Return the ultimate image of the device, with the value indicator in the right position"""
-        image = self.bg_image.copy()
-        image.blit(self.hand_image, self.hand_position())
-        return image
+    def hand(self):
+        return self.hand_image, (self.state, self.pixel(self.HAND_Y_LAMBDA))
 
 
 class TurnIndicator(LevelIndicator):
@@ -168,18 +220,15 @@ class TurnIndicator(LevelIndicator):
     HAND_MAX_Y_LAMBDA = 21
     HAND_MIN_Y_LAMBDA = 322
 
-    def __init__(self, values_range, coordinates, initial_value):
-        super().__init__(values_range, coordinates, initial_value)
+    def __init__(self, values_range, coordinates, initial_value, scale=1):
+        super().__init__(values_range, coordinates, initial_value, scale)
 
         # Load images
-        self.bg_image = assets.load_image('turn_background')
-        self.hand_image = assets.load_image('turn_hand')
+        self.bg_image = assets.load_image('turn_background', scale)
+        self.hand_image = assets.load_image('turn_hand', scale)
 
-    @property
-    def image(self):
+    def blit_labels(self, image):
         """Differs from the parent class, so that it has no labels"""
-        image = self.bg_image.copy()
-        image.blit(self.hand_image, self.hand_position())
         return image
 
 
@@ -205,63 +254,49 @@ class Gauge(Device):
         ('right', 335, 268),
     ]
 
-    def __init__(self, values_range, coordinates, initial_value):
-        super().__init__(values_range, coordinates, initial_value)
+    def __init__(self, values_range, coordinates, initial_value, scale=1):
+        super().__init__(values_range, coordinates, initial_value, scale)
 
         # Load images
-        self.bg_image = assets.load_image('gauge_background')
-        self.hand_image = assets.load_image('gauge_hand')
+        self.bg_image = assets.load_image('gauge_background', scale)
+        self.hand_atlas = rotations.get_atlas('gauge_hand', self.PIVOT_VECTOR, scale)
 
+        self.initialize_mapping((self.HAND_MIN_ANGLE, self.HAND_MAX_ANGLE), self.hand_atlas.index)
         self.labels = self.generate_labels()
 
-    def hand_angle(self):
-        """Return rotation angle of the hand, calculated from its value"""
-        if self.value == self.min_value:
-            return self.HAND_MIN_ANGLE
-        if self.value == self.max_value:
-            return self.HAND_MAX_ANGLE
-
-        # The below calculation bases on proportion
-        full_angle_range = self.HAND_MAX_ANGLE - self.HAND_MIN_ANGLE
-        full_value_range = self.max_value - self.min_value
-        current_value_lambda = self.value - self.min_value
-
-        # current_value_lambda / full_value_range = current_angle_lambda / full_angle_range
-        return (full_angle_range * current_value_lambda / full_value_range) + self.HAND_MIN_ANGLE
-
     def hand_image_rotated(self):
         """
         Return the image of the hand indicator, rotated by the current value angle
         And the coordinates on which the image has to be blitted
         """
-        angle = self.hand_angle()
-        rotated_img = pygame.transform.rotate(self.hand_image, angle)
-        rotated_rect_dimensions = rotated_img.get_rect().size
-        central_point = rotated_rect_dimensions[0]/2, rotated_rect_dimensions[1]/2
-        rotated_vector = rotate_vector(self.PIVOT_VECTOR, angle)
+        rotated_img, offset = self.hand_atlas.frame(self.state)
         coordinates = (
-            self.CENTRAL_POINT_X - central_point[0] + rotated_vector[0],
-            self.CENTRAL_POINT_Y - central_point[1] + rotated_vector[1]
+            self.CENTRAL_POINT_X * self.scale + offset[0],
+            self.CENTRAL_POINT_Y * self.scale + offset[1]
         )
         return rotated_img, coordinates
 
     def generate_labels(self):
         """Function to generate list of value labels, called only once by the init finction"""
-        font = pygame.font.SysFont("victorianparlorvintagealternate", 30)
+        font_size = round(30 * self.scale)
         labels_count = len(self.LABELS_COORDINATES)
         labels = []
         full_range = self.max_value - self.min_value
         for label_number in range(labels_count):
             value = int(self.min_value + full_range / (labels_count - 1) * label_number)
-            text = font.render(str(value), True, (0, 0, 0))
+            text = fonts.render(str(value), font_size)
             labels.append((
                 text,
                 (
-                    self.label_coordinates(*self.LABELS_COORDINATES[label_number], text.get_width())
+                    self.label_coordinates(*self.scaled_label_coordinates(label_number), text.get_width())
                 )
             ))
         return labels
 
+    def scaled_label_coordinates(self, label_number):
+        align, x, y = self.LABELS_COORDINATES[label_number]
+        return align, x * self.scale, y * self.scale
+
     @staticmethod
     def label_coordinates(align, x, y, width):
         """Return the coordinates of a label, so that it's aligned to the given point"""
@@ -278,14 +313,12 @@ class Gauge(Device):
             image.blit(*label)
         return image
 
-    @property
-    def image(self):
-        """Return the ultimate image of the device, with the value indicator in the right position"""
-        image = self.bg_image.copy()
-        image = self.blit_labels(image)
-        hand_image_rotated, hand_image_coordinates = self.hand_image_rotated()
-        image.blit(hand_image_rotated, hand_image_coordinates)
-        return image
+    def hand(self):
+        return self.hand_image_rotated()
+
+    def hand_pose(self):
+        central_point = self.CENTRAL_POINT_X * self.scale, self.CENTRAL_POINT_Y * self.scale
+        return self.hand_atlas.pose(self.state, central_point)
 
 
 class Compass(Device):
@@ -295,47 +328,30 @@ class Compass(Device):
     CENTRAL_POINT_X = 185
     CENTRAL_POINT_Y = 185
 
-    def __init__(self, values_range, coordinates, initial_value):
-        super().__init__(values_range, coordinates, initial_value)
+    def __init__(self, values_range, coordinates, initial_value, scale=1):
+        super().__init__(values_range, coordinates, initial_value, scale)
 
         # Load images
-        self.bg_image = assets.load_image('compass_background')
-        self.hand_image = assets.load_image('compass_hand')
-
-    def dial_angle(self):
-        """Return rotation angle of the dial, calculated from its value"""
-        if self.value == self.min_value:
-            return self.DIAL_MIN_ANGLE
-        if self.value == self.max_value:
-            return self.DIAL_MAX_ANGLE
-
-        # The below calculation bases on proportion
-        full_angle_range = self.DIAL_MAX_ANGLE - self.DIAL_MIN_ANGLE
-        full_value_range = self.max_value - self.min_value
-        current_value_lambda = self.value - self.min_value
+        self.bg_image = assets.load_image('compass_background', scale)
+        self.dial_atlas = rotations.get_atlas('compass_hand', scale=scale)
 
-        # current_value_lambda / full_value_range = current_angle_lambda / full_angle_range
-        return (full_angle_range * current_value_lambda / full_value_range) + self.DIAL_MIN_ANGLE
+        self.initialize_mapping((self.DIAL_MIN_ANGLE, self.DIAL_MAX_ANGLE), self.dial_atlas.index)
 
     def dial_image_rotated(self):
         """
         Return the image of the dial, rotated by the current value angle
         And the coordinates on which the image has to be blitted
         """
-        angle = self.dial_angle()
-        rotated_img = pygame.transform.rotate(self.hand_image, angle)
-        rotated_rect_dimensions = rotated_img.get_rect().size
-        central_point = rotated_rect_dimensions[0]/2, rotated_rect_dimensions[1]/2
+        rotated_img, offset = self.dial_atlas.frame(self.state)
         coordinates = (
-            self.CENTRAL_POINT_X - central_point[0],
-            self.CENTRAL_POINT_Y - central_point[1]
+            self.CENTRAL_POINT_X * self.scale + offset[0],
+            self.CENTRAL_POINT_Y * self.scale + offset[1]
         )
         return rotated_img, coordinates
 
-    @property
-    def image(self):
-        """Return the ultimate image of the device, with the value indicator in the right position"""
-        image = self.bg_image.copy()
-        dial_image_rotated, hand_image_coordinates = self.dial_image_rotated()
-        image.blit(dial_image_rotated, hand_image_coordinates)
-        return image
+    def hand(self):
+        return self.dial_image_rotated()
+
+    def hand_pose(self):
+        central_point = self.CENTRAL_POINT_X * self.scale, self.CENTRAL_POINT_Y * self.scale
+        return self.dial_atlas.pose(self.state, central_point)
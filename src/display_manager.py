@@ -1,45 +1,139 @@
+import time
+
 import pygame
 
 from src.assets import assets
+from src.bindings import DEVICES
 from src.parameters import PARAMETERS
+from src.profiler import OVERLAY_POSITION, ProfilerOverlay
 
 FULLSCREEN = True
-SCREEN_SIZE = (2560, 1440)
+# None uses the resolution of the display
+SCREEN_SIZE = None
+# Resolution the device coordinates are given for, layouts of other resolutions are scaled from it
+DESIGN_SIZE = (2560, 1440)
+# Load all images when the display is created, instead of on their first use
+PRELOAD_ASSETS = True
 
 
 class DisplayManager:
     """Object responsible for managing all items visible on screen"""
-    def __init__(self, zeppelin):
+    def __init__(self, zeppelin, profiler=None, clock=None):
         self.zeppelin = zeppelin
         pygame.display.set_mode(SCREEN_SIZE if SCREEN_SIZE else (0, 0), pygame.FULLSCREEN if FULLSCREEN else 0)
         self.screen = pygame.display.get_surface()
+        self.scale, self.offset = self.calculate_layout(self.screen.get_size())
+        assets.convert_images()
+        if PRELOAD_ASSETS:
+            load_times = assets.preload(self.scale)
+            if profiler is not None:
+                profiler.record_assets(load_times)
+        self.background = None
         self.initialize_background()
         self.devices = {}
         self.initialize_devices()
+        self.profiler = profiler
+        self.overlay = (
+            ProfilerOverlay(profiler, clock, self.layout_coordinates(OVERLAY_POSITION), self.scale)
+            if profiler is not None else None
+        )
         pygame.display.flip()
 
+    @staticmethod
+    def calculate_layout(screen_size):
+        """Return the scale fitting the design layout in the screen and the offset centering it"""
+        scale = min(screen_size[0] / DESIGN_SIZE[0], screen_size[1] / DESIGN_SIZE[1])
+        # Rounded, so that the scale is a stable key of the scaled assets cache
+        scale = round(scale, 4)
+        offset = (
+            round((screen_size[0] - DESIGN_SIZE[0] * scale) / 2),
+            round((screen_size[1] - DESIGN_SIZE[1] * scale) / 2)
+        )
+        return scale, offset
+
+    def layout_coordinates(self, coordinates):
+        """Return the screen coordinates of a point of the design layout"""
+        return (
+            self.offset[0] + round(coordinates[0] * self.scale),
+            self.offset[1] + round(coordinates[1] * self.scale)
+        )
+
     def initialize_devices(self):
         """Create all devices visible on the screen"""
-        for parameter, data in PARAMETERS.items():
-            if 'device' in data:
-                self.devices[parameter] = data['device']['class'](
-                    values_range=(data['min_value'], data['max_value']),
-                    coordinates=data['device']['coordinates'],
-                    initial_value=data['initial_value'],
-                )
-
-    def update_display(self):
-        """Update all devices and show them on the screen"""
-        dirty_rects = []
+        for parameter, device in DEVICES.items():
+            data = PARAMETERS[parameter]
+            self.devices[parameter] = device['class'](
+                values_range=(data['min_value'], data['max_value']),
+                coordinates=self.layout_coordinates(device['coordinates']),
+                initial_value=data['initial_value'],
+                scale=self.scale,
+            )
+            self.devices[parameter].initialize_layers(self.background)
+
+    def update_devices(self, values=None):
+        """
+        Update the values of all devices in a single pass, before any of them is drawn
+        Values of the parameters may be given explicitly, by default the current zeppelin values are shown
+        Return the names and devices whose hands have moved since they were last drawn
+        """
+        if values is None:
+            values = self.zeppelin.get_values()
+        changed = []
         for parameter, device in self.devices.items():
-            device.update(self.zeppelin.get_parameter(parameter))
-            rect = self.screen.blit(device.image, device.position)
-            dirty_rects.append(rect)
-        pygame.display.update(dirty_rects)
+            device.update(values[parameter])
+            if device.state != device.rendered_state:
+                changed.append((parameter, device))
+        return changed
+
+    def update_display(self, values=None):
+        """
+        Update all devices and show the ones that have changed on the screen
+        Values of the parameters may be given explicitly, by default the current zeppelin values are shown
+        Devices redraw only the areas of their moving hands, and only those areas are sent to the display
+        """
+        dirty_rects = []
+        for parameter, device in self.update_devices(values):
+            start = time.perf_counter() if self.profiler is not None else None
+            dirty_rects.extend(device.draw(self.screen))
+            if start is not None:
+                self.profiler.record_device(parameter, time.perf_counter() - start)
+        if self.overlay is not None:
+            dirty_rects.extend(self.overlay.draw(self.screen, self.background))
+        if dirty_rects:
+            pygame.display.update(self.merge_rects(dirty_rects))
+
+    @staticmethod
+    def merge_rects(rects):
+        """Merge overlapping rects into their unions, so that no area is sent to the display twice"""
+        merged = []
+        for rect in rects:
+            overlapping = rect.collidelistall(merged)
+            while overlapping:
+                rect = rect.unionall([merged[index] for index in overlapping])
+                merged = [other for index, other in enumerate(merged) if index not in overlapping]
+                overlapping = rect.collidelistall(merged)
+            merged.append(rect)
+        return merged
+
+    def reset(self, zeppelin):
+        """Show a new zeppelin, redrawing the whole screen"""
+        self.zeppelin = zeppelin
+        self.screen.blit(self.background, (0, 0))
+        for device in self.devices.values():
+            device.invalidate()
+        self.update_display()
+        pygame.display.flip()
 
     def initialize_background(self):
-        background = assets.load_image('background')
-        self.screen.blit(background, (0, 0))
+        self.background = self.load_background(self.screen.get_size())
+        self.screen.blit(self.background, (0, 0))
+
+    @staticmethod
+    def load_background(screen_size):
+        """Return the background scaled to cover the whole screen, even if its proportions differ from the design layout"""
+        background_size = assets.load_image('background').get_size()
+        scale = round(max(screen_size[0] / background_size[0], screen_size[1] / background_size[1]), 4)
+        return assets.load_image('background', scale)
 
     def black_screen(self):
         self.screen.fill((0, 0, 0))
@@ -1,25 +1,35 @@
 import pygame
 
-from src.parameters import PARAMETERS
+from src.bindings import CONTROLLERS
+
+# Interval between the repeated actions of a held key
+KEY_REPEAT_MILLISECONDS = 1000 / 60
+
+# Key fast-forwarding the flight for the game master, between the scenes
+SKIP_AHEAD_KEY = pygame.K_F10
+SKIP_AHEAD_MILLISECONDS = 20 * 60 * 1000
 
 
 class EventManager:
     """Object responsible for handling events and deputing updates to the zeppelin"""
-    def __init__(self, zeppelin):
+    def __init__(self, zeppelin, profiler=None, recorder=None):
         self.zeppelin = zeppelin
+        self.profiler = profiler
+        # Inputs and ticks are logged only on demand, for a later replay
+        self.recorder = recorder
         self.key_dict = {}
+        # Bound keys that are currently held, with the time passed since their last action
+        self.held_keys = {}
         self.initialize_keys()
 
     def initialize_keys(self):
         """Function to map keys to actions, called only once by the init function"""
-        for parameter, data in PARAMETERS.items():
-            if 'controller' in data:
-                controller = data['controller']
-                step = controller['step']
-                if 'increase' in controller:
-                    self.key_dict[controller['increase']] = self.zeppelin_parameter_changers_generator(parameter, step)
-                if 'decrease' in controller:
-                    self.key_dict[controller['decrease']] = self.zeppelin_parameter_changers_generator(parameter, -step)
+        for parameter, controller in CONTROLLERS.items():
+            step = controller['step']
+            if 'increase' in controller:
+                self.key_dict[controller['increase']] = self.zeppelin_parameter_changers_generator(parameter, step)
+            if 'decrease' in controller:
+                self.key_dict[controller['decrease']] = self.zeppelin_parameter_changers_generator(parameter, -step)
 
     @staticmethod
     def zeppelin_parameter_changers_generator(parameter, value):
@@ -28,10 +38,43 @@ class EventManager:
             zeppelin.change_parameter(parameter, value, hard=hard)
         return changer
 
+    def key_down(self, key):
+        """Process the key press with hard=True and start repeating its action if it is bound"""
+        if self.recorder is not None:
+            self.recorder.key_down(key)
+        self.process_event(key, hard=True)
+        if key in self.key_dict:
+            self.held_keys[key] = 0
+
+    def key_up(self, key):
+        """Stop repeating the action of a released key"""
+        if self.recorder is not None:
+            self.recorder.key_up(key)
+        self.held_keys.pop(key, None)
+
+    def process_held_keys(self, milliseconds):
+        """Repeat the actions of all held keys, once per KEY_REPEAT_MILLISECONDS of holding"""
+        for key in self.held_keys:
+            self.held_keys[key] += milliseconds
+            while self.held_keys[key] >= KEY_REPEAT_MILLISECONDS:
+                self.held_keys[key] -= KEY_REPEAT_MILLISECONDS
+                self.process_event(key)
+
+    def tick(self, milliseconds):
+        """Update the zeppelin by a single tick, after repeating the actions of the held keys"""
+        if self.recorder is not None:
+            self.recorder.tick(milliseconds)
+        self.process_held_keys(milliseconds)
+        self.zeppelin.update_values(milliseconds)
+
     def process_event(self, key, hard=False):
         """Depute an action to the zeppelin"""
         if hard and key == pygame.K_v:
             self.zeppelin.print_values()
+        if hard and key == pygame.K_p and self.profiler is not None:
+            self.profiler.dump()
+        if hard and key == SKIP_AHEAD_KEY:
+            self.zeppelin.advance(SKIP_AHEAD_MILLISECONDS)
         if key in self.key_dict:
             self.key_dict[key](self.zeppelin, hard=hard)
 
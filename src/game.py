@@ -4,57 +4,193 @@ from src.display_manager import DisplayManager
 from src.event_manager import EventManager
 from src.zeppelin import Zeppelin
 from src.assets import SoundController
+from src.const import TICK_MILLISECONDS, MAX_TICKS_PER_FRAME
+from src.profiler import FrameProfiler
+from src.simulation import SimulationThread
+from src.network import StationClient
+from src.recording import Recorder
+from src.world import World
+
+# Upper limit of rendered frames per second, 0 means no limit
+FRAMERATE = 60
+
+# Key starting a new game after the crash
+RESTART_KEY = pygame.K_RETURN
+# Interval of checking if another station has restarted the game, when connected to a server
+RESTART_POLL_MILLISECONDS = 100
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, profile=False, renderer='software', threaded=False, address=None, record=None, scenario=None):
         self.running = True
-        self.zeppelin = Zeppelin()
-        self.display_manager = DisplayManager(self.zeppelin)
-        self.event_manager = EventManager(self.zeppelin)
-        self.sound_controller = SoundController(self.zeppelin)
+        # In the threaded mode the zeppelin is updated by the simulation thread, started by run
+        # A station connected to the server address receives the state instead of simulating it
+        self.address = address
+        self.threaded = threaded or address is not None
+        self.simulation = None
         self.clock = pygame.time.Clock()
+        # Timings of the frames are recorded only on demand
+        self.profiler = FrameProfiler() if profile else None
+        # Inputs of the local simulation are logged to the given file, stations have none to record
+        self.recorder = Recorder(record) if record is not None and address is None else None
+        # Map features loaded once, and shared by the zeppelins of all restarted games
+        self.world = World.load()
+        # Scenario compiled once, and played again in every restarted game
+        self.scenario = scenario
+        self.zeppelin = Zeppelin(self.world, self.scenario)
+        if renderer == 'sdl2':
+            # Imported only on demand, so that the software renderer works with builds of pygame without _sdl2
+            from src.texture_display_manager import TextureDisplayManager
+            self.display_manager = TextureDisplayManager(self.zeppelin, self.profiler, self.clock)
+        else:
+            self.display_manager = DisplayManager(self.zeppelin, self.profiler, self.clock)
+        self.event_manager = EventManager(self.zeppelin, self.profiler, self.recorder)
+        self.sound_controller = SoundController(self.zeppelin)
 
     def run(self):
-        """The main loop iterating as long,  as the game is running"""
+        try:
+            if self.threaded:
+                self.run_threaded()
+            else:
+                self.run_sequential()
+        finally:
+            if self.recorder is not None:
+                self.recorder.close()
+
+    def run_sequential(self):
+        """
+        The main loop iterating as long,  as the game is running
+        The zeppelin is updated in fixed ticks, the frames show values interpolated between the last two ticks
+        """
+        accumulator = 0
+        previous_values = self.zeppelin.get_values()
         while self.running:
-            milliseconds_passed = self.clock.tick()
+            # Limit the time to catch up with, so that a long stall doesn't freeze the game with ticks
+            accumulator += self.clock.tick(FRAMERATE)
+            accumulator = min(accumulator, TICK_MILLISECONDS * MAX_TICKS_PER_FRAME)
+            if self.profiler is not None:
+                self.profiler.start_frame()
             self.controller_tick()
-            self.zeppelin.update_values(milliseconds_passed)
+            self.mark('controller_tick')
+            while accumulator >= TICK_MILLISECONDS and not self.zeppelin.crashed:
+                previous_values = self.zeppelin.get_values()
+                self.event_manager.tick(TICK_MILLISECONDS)
+                accumulator -= TICK_MILLISECONDS
+            self.mark('update_values')
             if self.zeppelin.crashed:
                 self.game_over()
+                # Don't catch up with the time spent on the crash screen
+                accumulator = 0
+                previous_values = self.zeppelin.get_values()
+                self.clock.tick()
             else:
-                self.view_tick()
+                self.view_tick(self.zeppelin.interpolate_values(previous_values, accumulator / TICK_MILLISECONDS))
+                self.mark('view_tick')
                 self.sound_tick()
+                self.mark('sound_tick')
+                if self.profiler is not None:
+                    self.profiler.end_frame()
 
-    def game_over(self):
-        """View the black screen when zeppelin is crashed"""
+    def run_threaded(self):
+        """
+        The main loop rendering the snapshots published by the simulation thread
+        Input events are passed to the simulation thread, so a slow frame doesn't delay the ticks
+        """
+        self.start_simulation()
         while self.running:
-            milliseconds_passed = self.clock.tick()
+            self.clock.tick(FRAMERATE)
+            if self.profiler is not None:
+                self.profiler.start_frame()
             self.controller_tick()
-            self.sound_controller.crash_sound()
-            self.display_manager.black_screen()
+            self.mark('controller_tick')
+            snapshot = self.simulation.snapshot
+            if snapshot.crashed:
+                self.game_over()
+            else:
+                self.view_tick(self.simulation.interpolated_values())
+                self.mark('view_tick')
+                self.sound_tick(snapshot.values)
+                self.mark('sound_tick')
+                if self.profiler is not None:
+                    self.profiler.end_frame()
+        self.simulation.stop()
+
+    def start_simulation(self):
+        if self.address is not None:
+            self.simulation = StationClient(self.zeppelin, self.address)
+        else:
+            self.simulation = SimulationThread(self.zeppelin, self.event_manager)
+        self.simulation.start()
+
+    @property
+    def crashed(self):
+        """Check if the zeppelin has crashed, as published by the simulation thread in the threaded mode"""
+        if self.simulation is not None:
+            return self.simulation.snapshot.crashed
+        return self.zeppelin.crashed
+
+    def mark(self, phase):
+        """Record the end of a phase of the frame, if profiling is enabled"""
+        if self.profiler is not None:
+            self.profiler.mark(phase)
+
+    def game_over(self):
+        """
+        View the black screen when zeppelin is crashed
+        The screen is drawn once, then the game sleeps until the restart or quit
+        Stations connected to a server wake up periodically, as the restart may come from another station
+        """
+        self.sound_controller.crash_sound()
+        self.display_manager.black_screen()
+        while self.running and self.crashed:
+            event = pygame.event.wait(RESTART_POLL_MILLISECONDS if self.address is not None else 0)
+            if event.type == pygame.KEYDOWN and event.key == RESTART_KEY:
+                self.restart()
+            else:
+                self.handle_event(event)
+        if self.running and self.address is not None:
+            self.sound_controller.reset(self.zeppelin)
+            self.display_manager.reset(self.zeppelin)
+
+    def restart(self):
+        """Start a new game with a fresh zeppelin, without reinitialising the display and sounds"""
+        if self.address is not None:
+            # The server starts the new game for all stations, they leave the crash screen once its state arrives
+            self.simulation.restart()
+            return
+        if self.simulation is not None:
+            self.simulation.stop()
+        if self.recorder is not None:
+            self.recorder.restart()
+        self.zeppelin = Zeppelin(self.world, self.scenario)
+        self.event_manager = EventManager(self.zeppelin, self.profiler, self.recorder)
+        self.sound_controller.reset(self.zeppelin)
+        self.display_manager.reset(self.zeppelin)
+        if self.threaded:
+            self.start_simulation()
+
+    def handle_event(self, event):
+        """Handle a single event"""
+        # Stop the game when quit signal appears
+        if event.type == pygame.QUIT or event.type == pygame.KEYUP and event.key == pygame.K_ESCAPE:
+            self.running = False
+        elif event.type == pygame.KEYDOWN:
+            self.controls.key_down(event.key)
+        elif event.type == pygame.KEYUP:
+            self.controls.key_up(event.key)
+
+    @property
+    def controls(self):
+        """Return the receiver of the key events, the simulation thread queues them for the event manager"""
+        return self.simulation if self.simulation is not None else self.event_manager
 
     def controller_tick(self):
-        """Get all events and send them to the event manager"""
+        """Get all events and send them to the event manager, held keys are repeated in the simulation ticks"""
         for event in pygame.event.get():
-            # Stop the game when quit signal appears
-            if event.type == pygame.QUIT or event.type == pygame.KEYUP and event.key == pygame.K_ESCAPE:
-                self.running = False
-            # When a button starts to be pressed, process an event with hard=True
-            elif event.type == pygame.KEYDOWN:
-                self.event_manager.process_event(event.key, hard=True)
-
-        # Also get all keys that continue to be pressed
-        keys = pygame.key.get_pressed()
-        if sum(keys):   # if any keys are currently pressed
-            # Process an event with hard=False (default)
-            for index in range(len(keys)):
-                if keys[index]:
-                    self.event_manager.process_event(index)
-
-    def view_tick(self):
-        self.display_manager.update_display()
-
-    def sound_tick(self):
-        self.sound_controller.update_sounds()
+            self.handle_event(event)
+
+    def view_tick(self, values=None):
+        self.display_manager.update_display(values)
+
+    def sound_tick(self, values=None):
+        self.sound_controller.update_sounds(values)
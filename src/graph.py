@@ -0,0 +1,75 @@
+from collections import namedtuple
+
+# Marks the nodes that have not been computed yet, it differs from any input values
+UNCOMPUTED = object()
+
+# Node computing derived values: it reads the named inputs, writes the named outputs and returns its result
+# Inputs and outputs are names of parameters or of other nodes, whose results are their outputs
+Node = namedtuple('Node', ['name', 'inputs', 'outputs', 'update'])
+
+
+class Result:
+    """Memoised result of a node, read by the following nodes as their input"""
+    __slots__ = ('value',)
+
+    def __init__(self, value=None):
+        self.value = value
+
+
+class DependencyGraph:
+    """
+    Nodes of derived values, sorted so that every node is evaluated after all nodes writing its inputs
+    A node is recomputed only when any of its inputs differs from the values it was last computed from,
+    a node writing its own inputs, or reading its own result, is recomputed until they settle
+    """
+    def __init__(self, nodes, parameters, initial_results=None):
+        initial_results = initial_results or {}
+        for node in nodes:
+            if node.name in parameters:
+                raise ValueError("Node '{}' has the name of a parameter".format(node.name))
+        self.results = {node.name: Result(initial_results.get(node.name)) for node in nodes}
+        self.nodes = self.sort(nodes)
+        # Parameters and results of the nodes are read the same way, by their value
+        sources = dict(parameters, **self.results)
+        # Every step is a list of the update of a node, the sources of its inputs, its result,
+        # and the input values it was last computed from
+        self.steps = [
+            [node.update, tuple(sources[name] for name in node.inputs), self.results[node.name], UNCOMPUTED]
+            for node in self.nodes
+        ]
+
+    @staticmethod
+    def sort(nodes):
+        """
+        Return the nodes in a topological order of the edges from the writers of every value to its readers
+        Independent nodes keep the order they are declared in, so that the evaluation is predictable
+        """
+        writers = {}
+        for node in nodes:
+            writers.setdefault(node.name, []).append(node)
+            for output in node.outputs:
+                writers.setdefault(output, []).append(node)
+        required = {
+            node.name: {writer.name for name in node.inputs for writer in writers.get(name, ()) if writer is not node}
+            for node in nodes
+        }
+        ordered = []
+        done = set()
+        while len(ordered) < len(nodes):
+            ready = next((node for node in nodes if node.name not in done and required[node.name] <= done), None)
+            if ready is None:
+                cycle = [node.name for node in nodes if node.name not in done]
+                raise ValueError('Dependency cycle among the nodes {}'.format(', '.join(cycle)))
+            ordered.append(ready)
+            done.add(ready.name)
+        return ordered
+
+    def evaluate(self):
+        """Recompute the nodes whose inputs have changed, in the sorted order"""
+        for step in self.steps:
+            values = [source.value for source in step[1]]
+            if values != step[3]:
+                step[2].value = step[0]()
+                # A node that has changed its own inputs is recomputed the next time too, until they settle,
+                # so that outside changes restoring the inputs it was computed from are not missed
+                step[3] = values if values == [source.value for source in step[1]] else UNCOMPUTED
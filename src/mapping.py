@@ -0,0 +1,67 @@
+# Number of equal parts of the values range, whose hand states are looked up instead of computed
+BUCKETS_COUNT = 4096
+# Marks the buckets whose states have not been checked yet
+UNCHECKED = object()
+# Bucket bounds are checked with this margin, a fraction of the bucket, so that rounding can't move a value across
+BUCKET_MARGIN = 0.001
+
+
+class ValueMapping:
+    """
+    Linear mapping of the values range of a device onto a range of screen positions or hand angles
+    The endpoints of the values range are mapped exactly onto the endpoints of the screen range
+    With a quantisation function the positions are turned into hand states, devices redraw only when the state changes
+    States of the buckets of the values range are looked up in a table filled lazily, on the first value in a bucket,
+    only the values in the few buckets crossing the boundary of two states are quantised exactly every time
+    """
+    def __init__(self, values_range, screen_range, quantise=None, buckets_count=BUCKETS_COUNT):
+        self.min_value, self.max_value = values_range
+        self.start, self.end = screen_range
+        self.quantise = quantise
+        self.buckets_count = buckets_count
+        self.bucket_size = (self.max_value - self.min_value) / buckets_count
+        self.buckets_per_value = buckets_count / (self.max_value - self.min_value)
+        # One more entry for the maximal value, mappings without quantisation give only the positions
+        self.table = [UNCHECKED] * (buckets_count + 1) if quantise is not None else None
+
+    def position(self, value):
+        """Return the screen position or angle of the value"""
+        if value == self.min_value:
+            return self.start
+        if value == self.max_value:
+            return self.end
+
+        # The below calculation bases on proportion
+        full_screen_range = self.end - self.start
+        full_value_range = self.max_value - self.min_value
+        current_value_lambda = value - self.min_value
+
+        # current_value_lambda / full_value_range = current_screen_lambda / full_screen_range
+        return (full_screen_range * current_value_lambda / full_value_range) + self.start
+
+    def exact_state(self, value):
+        return self.quantise(self.position(value))
+
+    def state(self, value):
+        """Return the hand state of a value within the values range"""
+        bucket = int((value - self.min_value) * self.buckets_per_value)
+        state = self.table[bucket]
+        if state is UNCHECKED:
+            state = self.table[bucket] = self.bucket_state(bucket)
+        if state is None:
+            return self.exact_state(value)
+        return state
+
+    def bucket_state(self, bucket):
+        """
+        Return the state of all values in the bucket, or None if there are more states in it
+        Positions and their quantisation are monotonic, so a bucket whose bounds share the state has no other states
+        The last bucket, and the entry for the maximal value, are always computed exactly
+        """
+        if bucket >= self.buckets_count - 1:
+            return None
+        margin = self.bucket_size * BUCKET_MARGIN
+        low = self.min_value + bucket * self.bucket_size
+        low_state = self.exact_state(max(low - margin, self.min_value))
+        high_state = self.exact_state(low + self.bucket_size + margin)
+        return low_state if low_state == high_state else None
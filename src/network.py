@@ -0,0 +1,230 @@
+import asyncio
+import struct
+import threading
+import time
+from types import MappingProxyType
+
+from src.const import TICK_MILLISECONDS, MAX_TICKS_PER_FRAME
+from src.event_manager import EventManager
+from src.parameters import PARAMETERS
+from src.simulation import SimulationThread, Snapshot
+from src.world import World
+from src.zeppelin import Zeppelin
+
+HOST = 'localhost'
+PORT = 5960
+
+# Index of every value in the messages, the coordinates are sent as two separate values
+FIELDS = [parameter for parameter in PARAMETERS if parameter != 'coordinates'] + ['x', 'y']
+# Server messages: tick number, count of the changed values and the crash flag, followed by the values
+STATE_HEADER = struct.Struct('<IB?')
+VALUE = struct.Struct('<Bd')
+# Client messages: command and the key it concerns
+COMMAND = struct.Struct('<BI')
+KEY_DOWN = 1
+KEY_UP = 2
+RESTART = 3
+# Bytes waiting for a station, above which it stops getting the changes until it catches up
+MAX_STATION_BUFFER = 64 * 1024
+
+
+def parse_address(text, host=HOST, port=PORT):
+    """Return the (host, port) tuple of an address given as HOST, HOST:PORT or :PORT"""
+    if not text:
+        return host, port
+    name, _, number = text.partition(':')
+    return name or host, int(number) if number else port
+
+
+def flatten(values):
+    """Return the values with the coordinates split into x and y, as they are sent"""
+    flat = {parameter: value for parameter, value in values.items() if parameter != 'coordinates'}
+    flat['x'], flat['y'] = values['coordinates']
+    return flat
+
+
+def unflatten(flat):
+    values = {parameter: value for parameter, value in flat.items() if parameter not in ('x', 'y')}
+    values['coordinates'] = flat['x'], flat['y']
+    return values
+
+
+def encode_state(tick, flat, crashed):
+    """Encode the given values into a single message, the values may be only the ones that have changed"""
+    return STATE_HEADER.pack(tick, len(flat), crashed) + b''.join(
+        VALUE.pack(FIELDS.index(field), value) for field, value in flat.items()
+    )
+
+
+class ZeppelinServer:
+    """
+    Authoritative simulation shared by all stations of the cockpit
+    Every tick only the values that have changed are broadcast, the stations send their key events back
+    Stations that don't keep up skip the changes, once their buffers have drained they get the full state again
+    """
+    def __init__(self, host=HOST, port=PORT, milliseconds=TICK_MILLISECONDS, scenario=None):
+        self.host = host
+        self.port = port
+        self.milliseconds = milliseconds
+        self.world = World.load()
+        self.scenario = scenario
+        self.zeppelin = Zeppelin(self.world, self.scenario)
+        # Every station holds its own keys, so the event managers are kept per connection
+        self.event_managers = {}
+        self.lagging_stations = set()
+        self.broadcast_values = flatten(self.zeppelin.get_values())
+        self.broadcast_crashed = False
+        self.tick = 0
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_station, self.host, self.port)
+        print('Serving the zeppelin on {}:{}'.format(self.host, self.port))
+        async with server:
+            await self.tick_loop()
+
+    async def tick_loop(self):
+        """Tick the zeppelin at a fixed rate and broadcast the changes"""
+        loop = asyncio.get_running_loop()
+        tick_seconds = self.milliseconds / 1000
+        next_tick = loop.time()
+        while True:
+            # Limit the time to catch up with, like the game loop does
+            next_tick = max(next_tick + tick_seconds, loop.time() - tick_seconds * MAX_TICKS_PER_FRAME)
+            await asyncio.sleep(max(next_tick - loop.time(), 0))
+            if not self.zeppelin.crashed:
+                for event_manager in self.event_managers.values():
+                    event_manager.process_held_keys(self.milliseconds)
+                self.zeppelin.update_values(self.milliseconds)
+                self.tick += 1
+            self.broadcast()
+
+    @staticmethod
+    def keeps_up(writer):
+        """Check if the station reads its messages, so that they don't pile up in the server's memory"""
+        return writer.transport.get_write_buffer_size() <= MAX_STATION_BUFFER
+
+    def broadcast(self):
+        """Send the values that have changed since the last broadcast to all stations"""
+        # Stations that have caught up get the last broadcast state, so that the following changes apply to it
+        for writer in [writer for writer in self.lagging_stations if self.keeps_up(writer)]:
+            self.lagging_stations.discard(writer)
+            writer.write(encode_state(self.tick, self.broadcast_values, self.broadcast_crashed))
+
+        flat = flatten(self.zeppelin.get_values())
+        crashed = bool(self.zeppelin.crashed)
+        delta = {field: value for field, value in flat.items() if self.broadcast_values[field] != value}
+        if not delta and crashed == self.broadcast_crashed:
+            return
+        message = encode_state(self.tick, delta, crashed)
+        for writer in self.event_managers:
+            if writer in self.lagging_stations:
+                continue
+            if self.keeps_up(writer):
+                writer.write(message)
+            else:
+                self.lagging_stations.add(writer)
+        self.broadcast_values = flat
+        self.broadcast_crashed = crashed
+
+    async def handle_station(self, reader, writer):
+        """Send the full state to a new station, then process its commands until it disconnects"""
+        # The last broadcast values, so that the following changes apply to them
+        writer.write(encode_state(self.tick, self.broadcast_values, self.broadcast_crashed))
+        self.event_managers[writer] = EventManager(self.zeppelin)
+        try:
+            while True:
+                command, key = COMMAND.unpack(await reader.readexactly(COMMAND.size))
+                if command == KEY_DOWN:
+                    self.event_managers[writer].key_down(key)
+                elif command == KEY_UP:
+                    self.event_managers[writer].key_up(key)
+                elif command == RESTART and self.zeppelin.crashed:
+                    self.restart()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self.event_managers[writer]
+            self.lagging_stations.discard(writer)
+            writer.close()
+
+    def restart(self):
+        """Start a new game for all stations"""
+        self.zeppelin = Zeppelin(self.world, self.scenario)
+        for writer in self.event_managers:
+            self.event_managers[writer] = EventManager(self.zeppelin)
+
+
+class StationClient(SimulationThread):
+    """
+    Thread receiving the state of the zeppelin from the server, in place of the local simulation
+    The local zeppelin is not updated, it provides only the parameter ranges and the interpolation
+    """
+    def __init__(self, zeppelin, address, milliseconds=TICK_MILLISECONDS):
+        super().__init__(zeppelin, None, milliseconds)
+        self.address = address
+        self.values = flatten(zeppelin.get_values())
+        self.loop = None
+        self.writer = None
+        self.task = None
+        self.connected = threading.Event()
+        self.error = None
+
+    def start(self):
+        """Start the thread and wait for the connection, raise the connection error if it fails"""
+        super().start()
+        self.connected.wait()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        asyncio.run(self.receive())
+
+    async def receive(self):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        try:
+            reader, self.writer = await asyncio.open_connection(*self.address)
+        except OSError as error:
+            self.error = error
+            return
+        finally:
+            self.connected.set()
+
+        try:
+            while True:
+                tick, count, crashed = STATE_HEADER.unpack(await reader.readexactly(STATE_HEADER.size))
+                for index, value in VALUE.iter_unpack(await reader.readexactly(VALUE.size * count)):
+                    self.values[FIELDS[index]] = value
+                self.publish(crashed)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            print('Disconnected from the server')
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.writer.close()
+
+    def publish(self, crashed):
+        values = MappingProxyType(unflatten(self.values))
+        self.snapshot = Snapshot(values, self.snapshot.values, crashed, time.perf_counter())
+
+    def send(self, command, key=0):
+        """Send the command to the server from any thread"""
+        if self.writer is not None:
+            self.loop.call_soon_threadsafe(self.writer.write, COMMAND.pack(command, key))
+
+    def key_down(self, key):
+        self.send(KEY_DOWN, key)
+
+    def key_up(self, key):
+        self.send(KEY_UP, key)
+
+    def restart(self):
+        self.send(RESTART)
+
+    def stop(self):
+        if self.task is not None and self.is_alive():
+            self.loop.call_soon_threadsafe(self.task.cancel)
+        self.join()
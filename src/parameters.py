@@ -1,8 +1,4 @@
-import pygame
-
-from src.devices import LevelIndicator, Gauge, Compass, HorizontalSnapIndicator, TurnIndicator
-
-
+# Pure simulation data, the devices and keys attached to the parameters are defined in src.bindings
 PARAMETERS = {
     # Parameters connected with changing height
     'height': {
@@ -10,10 +6,6 @@ PARAMETERS = {
         'min_value': 0,
         'max_value': 3000,
         'max_step': 7,
-        'device': {
-            'class': LevelIndicator,
-            'coordinates': (100, 50),
-        }
     },
     'destined_height': {
         'initial_value': 0,
@@ -24,16 +16,6 @@ PARAMETERS = {
         'initial_value': 3800,
         'min_value': 800,
         'max_value': 4000,
-        'controller': {
-            'step': 10,
-            'increase': pygame.K_w,
-            'decrease': pygame.K_z
-        },
-        'device': {
-            'class': Gauge,
-            'coordinates': (50, 900),
-        }
-
     },
     'pressure_change': {
         'initial_value': 0,
@@ -46,24 +28,11 @@ PARAMETERS = {
         'initial_value': 0,
         'min_value': -80,
         'max_value': 80,
-        'controller': {
-            'step': 1,
-            'increase': pygame.K_k,
-            'decrease': pygame.K_h
-        },
-        'device': {
-            'class': HorizontalSnapIndicator,
-            'coordinates': (700, 1100),
-        }
     },
     'velocity': {
         'initial_value': 0,
         'min_value': 0,
         'max_value': 80,
-        'device': {
-            'class': Gauge,
-            'coordinates': (400, 250),
-        }
     },
     'acceleration': {
         'initial_value': 0,
@@ -80,30 +49,16 @@ PARAMETERS = {
         'min_value': 0,
         'max_value': 80,
         'step': 5,
-        'device': {
-            'class': Gauge,
-            'coordinates': (850, 500),
-        }
-
     },
     'fuel': {
         'initial_value':  550,
         'min_value': 0,
         'max_value': 550,
-        'device': {
-            'class': LevelIndicator,
-            'coordinates': (1300, 50),
-        }
     },
     'turn': {
         'initial_value': 0,
         'min_value': -1,
         'max_value': 1,
-        'device': {
-            'class': TurnIndicator,
-            'coordinates': (1900, 900),
-        }
-
     },
 
     # Parameters connected with turning
@@ -111,42 +66,35 @@ PARAMETERS = {
         'initial_value': 0,
         'min_value': -30,
         'max_value': 30,
-        'controller': {
-            'step': 1,
-            'increase': pygame.K_RIGHT,
-            'decrease': pygame.K_LEFT
-        },
-        'device': {
-            'class': HorizontalSnapIndicator,
-            'coordinates': (1600, 700),
-        }
     },
     'direction': {
         'initial_value': 180,
         'min_value': 0,
         'max_value': 360,
-        'device': {
-            'class': Compass,
-            'coordinates': (1820, 200),
-        }
     },
     'coordinates': {
         'initial_value': (0, 0)
-    }
+    },
+
+    # Parameters connected with navigation, the maximal distance is shown when no port is within range
+    'port_distance': {
+        'initial_value': 80,
+        'min_value': 0,
+        'max_value': 80,
+    },
 }
 
 
 class Parameter:
-    """Basic parameter of a zeppelin"""
+    """Basic parameter of a zeppelin, slotted to keep the per-tick attribute access cheap"""
+    __slots__ = ('value', 'min_value', 'max_value', 'snapping_enabled', 'snap_to')
+
     def __init__(self, snap=None):
         self.value = None
         self.min_value = None
-        self.max_value  =None
-        if snap is not None:
-            self.snapping_enabled = True
-            self.snap_to = snap
-        else:
-            self.snapping_enabled = False
+        self.max_value = None
+        self.snapping_enabled = snap is not None
+        self.snap_to = snap
 
     def set_range(self, min_value, max_value):
         """Function called once  in the beginning, to set the max range"""
@@ -174,9 +122,20 @@ class Parameter:
             return
         self.set_value(self.value + number)
 
+    def interpolate(self, previous_value, alpha, value=None):
+        """
+        Return the value between the previous one and the current one, alpha being the fraction of the way
+        Another value may be given instead of the current one, to interpolate between published values
+        """
+        if value is None:
+            value = self.get_value()
+        return previous_value + (value - previous_value) * alpha
+
 
 class DirectionParameter(Parameter):
     """Continuous parameter, used for direction (0-360) implementation"""
+    __slots__ = ()
+
     def __init__(self, value=0, min_value=0, max_value=360, snap=None):
         Parameter.__init__(self, snap=snap)
 
@@ -188,9 +147,18 @@ class DirectionParameter(Parameter):
         else:
             self.value = value
 
+    def interpolate(self, previous_value, alpha, value=None):
+        """Interpolate along the shorter arc, so that the dial does not spin around when crossing 0"""
+        if value is None:
+            value = self.value
+        difference = (value - previous_value + self.max_value / 2) % self.max_value - self.max_value / 2
+        return (previous_value + difference * alpha) % self.max_value
+
 
 class TurnedParameter(Parameter):
     """Parameter that can have positive or  negative values, but the negative ones are hidden by default"""
+    __slots__ = ()
+
     def set_range(self, min_value, max_value):
         self.min_value = -max_value
         self.max_value = max_value
@@ -214,6 +182,8 @@ class TurnedParameter(Parameter):
 
 class HeightParameter(Parameter):
     """Parameter with crash control, when 0 level is achieved too fast"""
+    __slots__ = ()
+
     def change(self, number, hard=False):
         crash = None
         if self.value != self.min_value and self.value + number <= self.min_value and number <= -5:
@@ -224,12 +194,15 @@ class HeightParameter(Parameter):
         self.set_value(self.value + number)
         return crash
 
+
 class TwoDimensionalParameter(Parameter):
     """
     Parameter of two values, used for zeppelin coordinates implementation
     Self.value is a tuple
     This object does not implement min_value and max_value
     """
+    __slots__ = ()
+
     def __init__(self, snap=None):
         super().__init__(snap=snap)
         self.value = (None, None)
@@ -247,3 +220,11 @@ class TwoDimensionalParameter(Parameter):
     def change(self, numbers: tuple, hard=False):
         """Increase the value by numbers"""
         self.set_value((self.value[0] + numbers[0], self.value[1] + numbers[1]))
+
+    def interpolate(self, previous_value, alpha, value=None):
+        if value is None:
+            value = self.value
+        return (
+            previous_value[0] + (value[0] - previous_value[0]) * alpha,
+            previous_value[1] + (value[1] - previous_value[1]) * alpha
+        )
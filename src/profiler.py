@@ -0,0 +1,153 @@
+import csv
+import time
+from array import array
+
+import pygame
+
+from src.assets import fonts
+
+FRAMES_COUNT = 600
+PHASES = ['controller_tick', 'update_values', 'view_tick', 'sound_tick']
+OVERLAY_REFRESH_MILLISECONDS = 500
+# Top-left corner of the overlay in the design layout
+OVERLAY_POSITION = (2200, 10)
+OVERLAY_FONT_SIZE = 24
+
+
+class FrameProfiler:
+    """
+    Ring buffer of timings of the last frames, with a breakdown into phases and devices
+    Timings are stored in preallocated arrays of seconds, so that recording doesn't allocate
+    """
+    def __init__(self, frames_count=FRAMES_COUNT):
+        self.frames_count = frames_count
+        self.frame_times = array('d', [0]) * frames_count
+        self.phase_times = {phase: array('d', [0]) * frames_count for phase in PHASES}
+        self.device_times = {}
+        # Loading times of the preloaded images, by their asset name and scale
+        self.asset_times = {}
+        # Slot of the frame being recorded, the next frame's once it has ended
+        self.frame = 0
+        self.recorded_frames = 0
+        self.frame_start = None
+        self.phase_start = None
+
+    def start_frame(self):
+        for times in self.phase_times.values():
+            times[self.frame] = 0
+        for times in self.device_times.values():
+            times[self.frame] = 0
+        self.frame_start = self.phase_start = time.perf_counter()
+
+    def mark(self, phase):
+        """Record the time passed since the previous mark as the given phase"""
+        now = time.perf_counter()
+        self.phase_times[phase][self.frame] += now - self.phase_start
+        self.phase_start = now
+
+    def record_device(self, device, seconds):
+        if device not in self.device_times:
+            self.device_times[device] = array('d', [0]) * self.frames_count
+        self.device_times[device][self.frame] += seconds
+
+    def record_assets(self, load_times):
+        self.asset_times.update(load_times)
+
+    def end_frame(self):
+        self.frame_times[self.frame] = time.perf_counter() - self.frame_start
+        self.recorded_frames = min(self.recorded_frames + 1, self.frames_count)
+        self.frame = (self.frame + 1) % self.frames_count
+
+    def recorded(self, times):
+        """Return the recorded part of the times ring buffer"""
+        return times[:self.recorded_frames] if self.recorded_frames < self.frames_count else times
+
+    def percentile(self, fraction):
+        """Return the frame time in milliseconds, that the given fraction of recorded frames fits in"""
+        times = sorted(self.recorded(self.frame_times))
+        if not times:
+            return 0
+        return times[min(int(len(times) * fraction), len(times) - 1)] * 1000
+
+    def slowest_device(self):
+        """Return the name of the device with the longest average render time and the time in milliseconds"""
+        if not self.device_times or not self.recorded_frames:
+            return None, 0
+        device = max(self.device_times, key=lambda name: sum(self.recorded(self.device_times[name])))
+        return device, sum(self.recorded(self.device_times[device])) / self.recorded_frames * 1000
+
+    def dump(self, filename=None):
+        """Write the recorded frames to a CSV file, oldest first, return its name"""
+        if filename is None:
+            filename = 'profile_{}.csv'.format(time.strftime('%Y%m%d_%H%M%S'))
+        devices = sorted(self.device_times)
+        first = self.frame if self.recorded_frames == self.frames_count else 0
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['frame_ms'] + [phase + '_ms' for phase in PHASES] + [device + '_ms' for device in devices])
+            for number in range(self.recorded_frames):
+                frame = (first + number) % self.frames_count
+                writer.writerow(
+                    ['{:.3f}'.format(self.frame_times[frame] * 1000)]
+                    + ['{:.3f}'.format(self.phase_times[phase][frame] * 1000) for phase in PHASES]
+                    + ['{:.3f}'.format(self.device_times[device][frame] * 1000) for device in devices]
+                )
+        print('Profile saved to {}'.format(filename))
+        return filename
+
+
+class ProfilerOverlay:
+    """
+    On-screen summary of the profiler, refreshed a few times per second
+    The position is given in screen coordinates, placed by the display manager like the devices
+    """
+    def __init__(self, profiler, clock, position, scale=1):
+        self.profiler = profiler
+        self.clock = clock
+        self.position = position
+        self.font = fonts.get_font(None, round(OVERLAY_FONT_SIZE * scale))
+        self.rect = None
+        self.last_refresh = 0
+
+    def lines(self):
+        device, device_time = self.profiler.slowest_device()
+        return [
+            'FPS: {:.1f}'.format(self.clock.get_fps()),
+            'frame p50: {:.2f} ms  p99: {:.2f} ms'.format(self.profiler.percentile(0.5), self.profiler.percentile(0.99)),
+            'slowest device: {} {:.2f} ms'.format(device, device_time),
+            'assets: {} images in {:.0f} ms'.format(
+                len(self.profiler.asset_times), sum(self.profiler.asset_times.values()) * 1000
+            ),
+        ]
+
+    def due(self):
+        """Check if the overlay should be refreshed, marking it as refreshed now"""
+        now = pygame.time.get_ticks()
+        if now - self.last_refresh < OVERLAY_REFRESH_MILLISECONDS:
+            return False
+        self.last_refresh = now
+        return True
+
+    def render(self):
+        """Return a transparent image of the summary lines"""
+        texts = [self.font.render(line, True, (0, 0, 0)) for line in self.lines()]
+        line_size = self.font.get_linesize()
+        image = pygame.Surface(
+            (max(text.get_width() for text in texts), line_size * (len(texts) - 1) + texts[-1].get_height()),
+            pygame.SRCALPHA
+        )
+        for number, text in enumerate(texts):
+            image.blit(text, (0, number * line_size))
+        return image
+
+    def draw(self, screen, background):
+        """Draw the overlay if it is due for a refresh, return the list of dirty rects"""
+        if not self.due():
+            return []
+
+        dirty_rects = []
+        if self.rect is not None:
+            dirty_rects.append(screen.blit(background, self.rect, self.rect))
+        self.rect = screen.blit(self.render(), self.position)
+        dirty_rects.append(self.rect)
+        return dirty_rects
@@ -0,0 +1,103 @@
+import struct
+import time
+
+from src.event_manager import EventManager
+from src.world import World
+from src.zeppelin import Zeppelin
+
+MAGIC = b'URANTIAREC1'
+# Write the log in large chunks, instead of a system call for every record
+BUFFER_SIZE = 64 * 1024
+
+# Every record starts with its kind, the layout of the rest depends on it
+KIND = struct.Struct('<B')
+TICK = 1
+KEY_DOWN = 2
+KEY_UP = 3
+RESTART = 4
+# Tick: milliseconds of the tick, exactly as passed to the zeppelin
+TICK_RECORD = struct.Struct('<d')
+# Key: key code and milliseconds of the simulation passed since the start of the game
+KEY_RECORD = struct.Struct('<Id')
+RESTART_RECORD = struct.Struct('')
+RECORDS = {TICK: TICK_RECORD, KEY_DOWN: KEY_RECORD, KEY_UP: KEY_RECORD, RESTART: RESTART_RECORD}
+
+
+class Recorder:
+    """
+    Binary log of the inputs of the simulation, from which the game can be replayed tick by tick
+    The simulation is deterministic, so the key events in their order among the ticks are enough to replay it
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb', buffering=BUFFER_SIZE)
+        self.file.write(MAGIC)
+        self.milliseconds = 0
+
+    def tick(self, milliseconds):
+        self.file.write(KIND.pack(TICK) + TICK_RECORD.pack(milliseconds))
+        self.milliseconds += milliseconds
+
+    def key_down(self, key):
+        self.file.write(KIND.pack(KEY_DOWN) + KEY_RECORD.pack(key, self.milliseconds))
+
+    def key_up(self, key):
+        self.file.write(KIND.pack(KEY_UP) + KEY_RECORD.pack(key, self.milliseconds))
+
+    def restart(self):
+        self.file.write(KIND.pack(RESTART) + RESTART_RECORD.pack())
+        self.milliseconds = 0
+
+    def close(self):
+        self.file.close()
+
+
+def read_records(path):
+    """Yield the records of the log as tuples of the kind and its values"""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("{} is not a recording".format(path))
+    position = len(MAGIC)
+    while position < len(data):
+        kind, = KIND.unpack_from(data, position)
+        position += KIND.size
+        if kind not in RECORDS:
+            raise ValueError("Unknown record {} at byte {} of {}".format(kind, position - KIND.size, path))
+        layout = RECORDS[kind]
+        yield (kind,) + layout.unpack_from(data, position)
+        position += layout.size
+
+
+def replay(path, scenario=None):
+    """
+    Drive a zeppelin with the recorded inputs as fast as possible, without the display and sounds
+    Return the zeppelin of the last recorded game and the number of replayed ticks
+    The world and the scenario are not recorded, the game is replayed in the current world with the given scenario
+    """
+    world = World.load()
+    zeppelin = Zeppelin(world, scenario)
+    event_manager = EventManager(zeppelin)
+    ticks = 0
+    for record in read_records(path):
+        kind = record[0]
+        if kind == TICK:
+            event_manager.tick(record[1])
+            ticks += 1
+        elif kind == KEY_DOWN:
+            event_manager.key_down(record[1])
+        elif kind == KEY_UP:
+            event_manager.key_up(record[1])
+        elif kind == RESTART:
+            zeppelin = Zeppelin(world, scenario)
+            event_manager = EventManager(zeppelin)
+    return zeppelin, ticks
+
+
+def main(path, scenario=None):
+    """Replay the recording and print the final state with the replay speed"""
+    start = time.perf_counter()
+    zeppelin, ticks = replay(path, scenario)
+    seconds = time.perf_counter() - start
+    zeppelin.print_values()
+    print('Replayed {} ticks in {:.3f} s{}'.format(ticks, seconds, ', crashed' if zeppelin.crashed else ''))
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+import pygame
+
+from src.assets import assets
+from src.utils import rotate_vector
+
+# Finest angular resolution of the atlases, in degrees
+ROTATION_RESOLUTION = 0.25
+# Memory the frames of a single atlas may take, in bytes, the least recently used frames are evicted over it
+ATLAS_MEMORY_LIMIT = 64 * 1024 * 1024
+# Angles the size of the frames is sampled at, the other quarters of a turn repeat their sizes transposed
+SAMPLED_ANGLES = range(0, 90, 5)
+# Part of the memory limit left for the frames between the sampled angles being larger than the sampled ones
+FRAME_MEMORY_MARGIN = 0.05
+
+
+class RotationAtlas:
+    """
+    Rotations of a single image, pre-rendered lazily at a fixed angular resolution
+    Each frame is stored together with the offset of its top-left corner from the rotation centre
+    Large images get a coarser resolution, so that the frames of a full turn fit in the memory limit
+    """
+    def __init__(self, image, pivot_vector=(0, 0), resolution=None, memory_limit=ATLAS_MEMORY_LIMIT):
+        self.image = image
+        self.pivot_vector = pivot_vector
+        if resolution is None:
+            self.frames_count = self.fitting_frames_count(memory_limit)
+        else:
+            self.frames_count = round(360 / resolution)
+        self.resolution = 360 / self.frames_count
+        self.memory_limit = memory_limit
+        self.memory = 0
+        self.frames = OrderedDict()
+
+    def fitting_frames_count(self, memory_limit):
+        """
+        Return the number of frames of a full turn, as many as fit in the memory limit, up to the finest resolution
+        A turn cycles through all frames, so any frame evicted before the turn ends would be rendered again
+        """
+        sampled_memory = [self.frame_memory(self.render(angle)) for angle in SAMPLED_ANGLES]
+        frame_memory = max(sum(sampled_memory) / len(sampled_memory), 1)
+        fitting_count = int(memory_limit * (1 - FRAME_MEMORY_MARGIN) / frame_memory)
+        return max(min(fitting_count, round(360 / ROTATION_RESOLUTION)), 1)
+
+    def index(self, angle):
+        """Return the index of the frame closest to the given angle"""
+        return round(angle / self.resolution) % self.frames_count
+
+    def frame(self, index):
+        """
+        Return a tuple of the rotated image and its blit offset, rendering it on the first use
+        When the frames exceed the memory limit, the least recently used ones are evicted
+        """
+        frame = self.frames.get(index)
+        if frame is not None:
+            self.frames.move_to_end(index)
+            return frame
+        frame = self.frames[index] = self.render(index * self.resolution)
+        self.memory += self.frame_memory(frame)
+        while self.memory > self.memory_limit and len(self.frames) > 1:
+            _, evicted = self.frames.popitem(last=False)
+            self.memory -= self.frame_memory(evicted)
+        return frame
+
+    @staticmethod
+    def frame_memory(frame):
+        rotated_img = frame[0]
+        return rotated_img.get_width() * rotated_img.get_height() * rotated_img.get_bytesize()
+
+    def render(self, angle):
+        """
+        Rotate the image by the angle and calculate the offset on which it has to be blitted
+        The frame is cropped to its visible pixels, the transparent corners of the rotation are not kept
+        """
+        rotated_img = pygame.transform.rotate(self.image, angle)
+        rotated_rect_dimensions = rotated_img.get_rect().size
+        central_point = rotated_rect_dimensions[0]/2, rotated_rect_dimensions[1]/2
+        rotated_vector = rotate_vector(self.pivot_vector, angle)
+        visible_rect = rotated_img.get_bounding_rect()
+        offset = (
+            rotated_vector[0] - central_point[0] + visible_rect.x,
+            rotated_vector[1] - central_point[1] + visible_rect.y
+        )
+        return rotated_img.subsurface(visible_rect).copy(), offset
+
+    def pose(self, index, central_point):
+        """
+        Return the unrotated image, its top-left corner, the angle of the frame and the rotation origin
+        Used by renderers rotating the image themselves, the origin is given relative to the image
+        """
+        width, height = self.image.get_size()
+        origin = width / 2 - self.pivot_vector[0], height / 2 - self.pivot_vector[1]
+        coordinates = central_point[0] - origin[0], central_point[1] - origin[1]
+        return self.image, coordinates, index * self.resolution, origin
+
+
+class RotationLibrary:
+    """Object responsible for sharing rotation atlases between devices using the same image"""
+    def __init__(self):
+        self.atlases = {}
+
+    def get_atlas(self, asset_name, pivot_vector=(0, 0), scale=1):
+        """Return the atlas of the image scaled to the screen layout, the pivot vector is given unscaled"""
+        key = asset_name, tuple(pivot_vector), scale
+        if key not in self.atlases:
+            self.atlases[key] = RotationAtlas(
+                assets.load_image(asset_name, scale),
+                (pivot_vector[0] * scale, pivot_vector[1] * scale)
+            )
+        return self.atlases[key]
+
+
+rotations = RotationLibrary()
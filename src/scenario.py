@@ -0,0 +1,209 @@
+import heapq
+import json
+import math
+from collections import namedtuple
+
+from src.parameters import PARAMETERS
+
+# Dependency of the conditions on the features the zeppelin is within
+NAVIGATION = 'navigation'
+# Time triggers fire this much early, as the sum of fractional tick milliseconds drifts from the exact time
+TIME_TOLERANCE = 1e-6
+# Longest fast-forward the borders of the features are looked for along, 10 minutes of ticks
+MAX_CRUISE_TICKS = 36000
+
+# Condition compiled into a function of the zeppelin, with the set of values it depends on
+# and the set of (parameter, value) thresholds it compares them with
+Condition = namedtuple('Condition', ['check', 'dependencies', 'thresholds'])
+# Trigger firing its actions at the given time, or when its condition becomes true
+Trigger = namedtuple('Trigger', ['name', 'actions', 'at', 'every', 'condition', 'once'])
+
+
+class Scenario:
+    """
+    Story beats of a game, declared as triggers with actions, compiled once when the scenario is loaded
+    Time triggers fire after the given seconds of the game, optionally repeating every given seconds
+    Condition triggers fire every time their condition becomes true, or only the first time if they are 'once'
+    """
+    def __init__(self, definition):
+        self.triggers = [self.compile_trigger(entry) for entry in definition['triggers']]
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls(json.load(file))
+
+    def compile_trigger(self, entry):
+        name = entry.get('name', '')
+        if ('at' in entry) == ('when' in entry):
+            raise ValueError("Trigger '{}' needs either 'at' or 'when'".format(name))
+        actions = [self.compile_action(name, action) for action in entry['actions']]
+        every = entry.get('every')
+        return Trigger(
+            name=name,
+            actions=actions,
+            at=entry['at'] * 1000 if 'at' in entry else None,
+            every=every * 1000 if every is not None else None,
+            condition=self.compile_condition(name, entry['when']) if 'when' in entry else None,
+            once=entry.get('once', True),
+        )
+
+    def compile_condition(self, name, entry):
+        """Return the condition described by the entry, as a function of the zeppelin and its dependencies"""
+        if 'all' in entry or 'any' in entry:
+            conditions = [self.compile_condition(name, part) for part in entry.get('all', entry.get('any'))]
+            checks = [condition.check for condition in conditions]
+            combine = all if 'all' in entry else any
+            return Condition(
+                lambda zeppelin: combine(check(zeppelin) for check in checks),
+                frozenset().union(*(condition.dependencies for condition in conditions)),
+                frozenset().union(*(condition.thresholds for condition in conditions))
+            )
+        if 'inside' in entry:
+            feature_name = entry['inside']
+            return Condition(
+                lambda zeppelin: zeppelin.navigator is not None
+                and any(feature.name == feature_name for feature in zeppelin.navigator.inside),
+                frozenset([NAVIGATION]),
+                frozenset()
+            )
+        if 'parameter' in entry:
+            parameter = self.check_parameter(name, entry['parameter'])
+            below = entry.get('below')
+            above = entry.get('above')
+            return Condition(
+                lambda zeppelin: (below is None or zeppelin.get_parameter(parameter) < below)
+                and (above is None or zeppelin.get_parameter(parameter) > above),
+                frozenset([parameter]),
+                frozenset((parameter, value) for value in (below, above) if value is not None)
+            )
+        raise ValueError("Unknown condition {} in trigger '{}'".format(entry, name))
+
+    def compile_action(self, name, entry):
+        """Return the action described by the entry, as a function of the zeppelin"""
+        action = entry.get('action')
+        if action == 'change':
+            parameter = self.check_parameter(name, entry['parameter'])
+            value = entry['value']
+            hard = entry.get('hard', True)
+            return lambda zeppelin: zeppelin.change_parameter(parameter, value, hard=hard)
+        if action == 'set':
+            parameter = self.check_parameter(name, entry['parameter'])
+            value = entry['value']
+            return lambda zeppelin: zeppelin.set_parameter(parameter, value)
+        if action == 'turn_off_engine':
+            return lambda zeppelin: zeppelin.turn_off_engine()
+        if action == 'message':
+            text = entry['text']
+            return lambda zeppelin: print('Scenario: {}'.format(text))
+        raise ValueError("Unknown action {} in trigger '{}'".format(entry, name))
+
+    @staticmethod
+    def check_parameter(name, parameter):
+        """Return the parameter, if it exists and has a single numeric value, that can be compared and changed"""
+        if parameter not in PARAMETERS:
+            raise ValueError("Unknown parameter '{}' in trigger '{}'".format(parameter, name))
+        if not isinstance(PARAMETERS[parameter]['initial_value'], (int, float)):
+            raise ValueError("Parameter '{}' in trigger '{}' is not a number".format(parameter, name))
+        return parameter
+
+
+class ScenarioRun:
+    """
+    State of a scenario played with a single zeppelin, updated after every tick
+    Time triggers wait in a heap ordered by their time, condition triggers are checked only
+    when any of the values they depend on has changed since the previous tick
+    """
+    def __init__(self, scenario, zeppelin):
+        self.zeppelin = zeppelin
+        self.triggers = scenario.triggers
+        self.milliseconds = 0
+        # Triggers are referred to by their index in the scenario
+        self.schedule = []
+        self.dependents = {}
+        self.states = [False] * len(self.triggers)
+        self.fired = [False] * len(self.triggers)
+        for index, trigger in enumerate(self.triggers):
+            if trigger.condition is None:
+                heapq.heappush(self.schedule, (trigger.at, index))
+                continue
+            for dependency in trigger.condition.dependencies:
+                self.dependents.setdefault(dependency, []).append(index)
+        # All conditions are checked in the first update
+        self.values = {dependency: None for dependency in self.dependents}
+        # Values compared by the conditions, a fast-forward must not skip over them
+        self.thresholds = {}
+        for trigger in self.triggers:
+            if trigger.condition is not None:
+                for parameter, value in trigger.condition.thresholds:
+                    self.thresholds.setdefault(parameter, set()).add(value)
+
+    def milliseconds_to_next(self):
+        """Return the time left to the next time trigger, or None if there are no more"""
+        return self.schedule[0][0] - TIME_TOLERANCE - self.milliseconds if self.schedule else None
+
+    def cruise_ticks(self, milliseconds, distance, rates):
+        """
+        Return the number of ticks a steady zeppelin can be fast-forwarded by, before any trigger may fire
+        That is up to the next time trigger, or until any parameter changing at the given rate per tick
+        comes close to a threshold of the conditions, or the distance covered by the ticks comes close to a threshold
+        of the port distance or to the border of a feature of the world, if any conditions depend on them
+        The tick crossing the threshold is then stepped as usual, so that the conditions are checked in it
+        """
+        ticks = math.inf
+        if self.schedule:
+            ticks = math.ceil(self.milliseconds_to_next() / milliseconds) - 1
+        for parameter, rate in rates.items():
+            if not rate or parameter not in self.thresholds:
+                continue
+            value = self.zeppelin.get_parameter(parameter)
+            # The ends of the range are included, as wrapping parameters jump from one to the other
+            for threshold in self.thresholds[parameter].union(self.zeppelin.get_range(parameter)):
+                ticks_to_threshold = (threshold - value) / rate
+                if ticks_to_threshold >= 0:
+                    ticks = min(ticks, math.ceil(ticks_to_threshold) - 2)
+        if distance:
+            # The port distance and the distances to the borders of features change at most by the distance covered
+            clearances = [
+                abs(self.zeppelin.get_parameter('port_distance') - threshold)
+                for threshold in self.thresholds.get('port_distance', ())
+            ]
+            if NAVIGATION in self.dependents and self.zeppelin.navigator is not None:
+                reach = distance * min(ticks, MAX_CRUISE_TICKS)
+                clearances.append(self.zeppelin.navigator.clearance(*self.zeppelin.get_parameter('coordinates'), reach))
+            if clearances:
+                ticks = min(ticks, math.ceil(min(clearances) / distance) - 2)
+        return ticks
+
+    def update(self, milliseconds):
+        self.milliseconds += milliseconds
+        while self.schedule and self.schedule[0][0] - TIME_TOLERANCE <= self.milliseconds:
+            at, index = heapq.heappop(self.schedule)
+            self.fire(index)
+            if self.triggers[index].every:
+                heapq.heappush(self.schedule, (at + self.triggers[index].every, index))
+
+        changed_triggers = set()
+        for dependency, value in self.values.items():
+            if dependency == NAVIGATION:
+                navigator = self.zeppelin.navigator
+                changed = value is None or navigator is not None and bool(navigator.entered or navigator.left)
+                current = True
+            else:
+                current = self.zeppelin.get_parameter(dependency)
+                changed = current != value
+            if changed:
+                self.values[dependency] = current
+                changed_triggers.update(self.dependents[dependency])
+        # Checked in the order of the scenario, so that the actions are applied in a predictable order
+        for index in sorted(changed_triggers):
+            trigger = self.triggers[index]
+            state = trigger.condition.check(self.zeppelin)
+            if state and not self.states[index] and not (trigger.once and self.fired[index]):
+                self.fire(index)
+            self.states[index] = state
+
+    def fire(self, index):
+        self.fired[index] = True
+        for action in self.triggers[index].actions:
+            action(self.zeppelin)
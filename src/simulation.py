@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from src.const import TICK_MILLISECONDS, MAX_TICKS_PER_FRAME
+
+# Values of all parameters after a tick, with the values of the tick before, for interpolation
+# The time is the perf_counter moment the tick was scheduled for
+Snapshot = namedtuple('Snapshot', ['values', 'previous_values', 'crashed', 'time'])
+
+
+class SimulationThread(threading.Thread):
+    """
+    Thread updating the zeppelin at a fixed rate, independently of the rendering
+    Input events are received through a queue, the state is published as immutable snapshots
+    Replacing the snapshot is a single assignment, so readers need no lock
+    """
+    def __init__(self, zeppelin, event_manager, milliseconds=TICK_MILLISECONDS):
+        super().__init__(name='simulation', daemon=True)
+        self.zeppelin = zeppelin
+        self.event_manager = event_manager
+        self.milliseconds = milliseconds
+        self.inputs = queue.Queue()
+        self.stopped = threading.Event()
+        values = MappingProxyType(zeppelin.get_values())
+        self.snapshot = Snapshot(values, values, zeppelin.crashed, time.perf_counter())
+
+    def key_down(self, key):
+        self.inputs.put((self.event_manager.key_down, key))
+
+    def key_up(self, key):
+        self.inputs.put((self.event_manager.key_up, key))
+
+    def process_inputs(self):
+        """Pass all queued input events to the event manager"""
+        while True:
+            try:
+                handler, key = self.inputs.get_nowait()
+            except queue.Empty:
+                return
+            handler(key)
+
+    def publish(self, tick_time):
+        values = MappingProxyType(self.zeppelin.get_values())
+        self.snapshot = Snapshot(values, self.snapshot.values, self.zeppelin.crashed, tick_time)
+
+    def run(self):
+        """Tick the zeppelin until it crashes or the thread is stopped"""
+        tick_seconds = self.milliseconds / 1000
+        next_tick = time.perf_counter()
+        while not self.stopped.is_set() and not self.zeppelin.crashed:
+            self.process_inputs()
+            # Limit the time to catch up with, like the single-threaded loop does
+            now = time.perf_counter()
+            next_tick = max(next_tick, now - tick_seconds * MAX_TICKS_PER_FRAME)
+            while next_tick <= now and not self.zeppelin.crashed:
+                self.event_manager.tick(self.milliseconds)
+                self.publish(next_tick)
+                next_tick += tick_seconds
+            self.stopped.wait(max(next_tick - time.perf_counter(), 0))
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def interpolated_values(self):
+        """Return the values of the latest snapshot, interpolated to the current moment"""
+        snapshot = self.snapshot
+        alpha = min((time.perf_counter() - snapshot.time) / (self.milliseconds / 1000), 1)
+        return self.zeppelin.interpolate_values(snapshot.previous_values, alpha, snapshot.values)
@@ -0,0 +1,96 @@
+import time
+
+import pygame
+from pygame._sdl2.video import Renderer, Texture, Window
+
+from src.display_manager import DisplayManager, FULLSCREEN, SCREEN_SIZE, PRELOAD_ASSETS
+from src.assets import assets
+from src.profiler import OVERLAY_POSITION, ProfilerOverlay
+
+# 1 requires a GPU renderer, 0 forces the software one, -1 prefers the GPU if there is one
+ACCELERATED = -1
+VSYNC = False
+
+
+class TextureDisplayManager(DisplayManager):
+    """
+    Display manager drawing with the SDL2 renderer, instead of blitting onto the display surface
+    Backgrounds and hands are uploaded as textures once, the renderer rotates the hands while drawing them
+    """
+    def __init__(self, zeppelin, profiler=None, clock=None, accelerated=ACCELERATED):
+        self.zeppelin = zeppelin
+        size = SCREEN_SIZE if SCREEN_SIZE else pygame.display.get_desktop_sizes()[0]
+        # Take over the caption set for the display module window
+        caption = pygame.display.get_caption()
+        self.window = Window(caption[0] if caption else 'pygame window', size=size, fullscreen=FULLSCREEN)
+        self.renderer = Renderer(self.window, accelerated=accelerated, vsync=VSYNC)
+        self.scale, self.offset = self.calculate_layout(self.window.size)
+        if PRELOAD_ASSETS:
+            load_times = assets.preload(self.scale)
+            if profiler is not None:
+                profiler.record_assets(load_times)
+        self.textures = {}
+        self.background = self.load_background(self.window.size)
+        self.devices = {}
+        self.initialize_devices()
+        self.profiler = profiler
+        self.overlay = (
+            ProfilerOverlay(profiler, clock, self.layout_coordinates(OVERLAY_POSITION), self.scale)
+            if profiler is not None else None
+        )
+        self.overlay_texture = None
+        self.present()
+
+    def texture(self, image):
+        """Return the texture of the image, uploading it on the first use"""
+        if image not in self.textures:
+            self.textures[image] = Texture.from_surface(self.renderer, image)
+        return self.textures[image]
+
+    def update_display(self, values=None):
+        """
+        Update all devices and draw the whole screen again, if any of them has changed
+        Values of the parameters may be given explicitly, by default the current zeppelin values are shown
+        """
+        changed = bool(self.update_devices(values))
+        if self.overlay is not None and self.overlay.due():
+            # The overlay changes with every refresh, so its texture is not kept in the textures cache
+            self.overlay_texture = Texture.from_surface(self.renderer, self.overlay.render())
+            changed = True
+        if changed:
+            self.present()
+
+    def present(self):
+        """Draw the background, all devices and the overlay, then show them on the screen"""
+        self.texture(self.background).draw(dstrect=(0, 0))
+        for parameter, device in self.devices.items():
+            start = time.perf_counter() if self.profiler is not None else None
+            # The viewport clips the hands to the device and makes the device coordinates relative to it
+            self.renderer.set_viewport(device.rect)
+            self.texture(device.static_layer).draw(dstrect=(0, 0))
+            hand_image, coordinates, angle, origin = device.hand_pose()
+            # Pygame rotates counterclockwise, the renderer clockwise
+            self.texture(hand_image).draw(
+                dstrect=(round(coordinates[0]), round(coordinates[1]), *hand_image.get_size()),
+                angle=-angle,
+                origin=(round(origin[0]), round(origin[1])) if origin is not None else None
+            )
+            device.rendered_state = device.state
+            if start is not None:
+                self.profiler.record_device(parameter, time.perf_counter() - start)
+        self.renderer.set_viewport(None)
+        if self.overlay_texture is not None:
+            self.overlay_texture.draw(dstrect=self.overlay.position)
+        self.renderer.present()
+
+    def reset(self, zeppelin):
+        """Show a new zeppelin, redrawing the whole screen"""
+        self.zeppelin = zeppelin
+        for device in self.devices.values():
+            device.invalidate()
+        self.update_display()
+
+    def black_screen(self):
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+        self.renderer.present()
@@ -0,0 +1,175 @@
+import json
+import math
+import os
+from collections import namedtuple
+
+from src.parameters import PARAMETERS
+
+WORLD_PATH = 'assets/world.json'
+# Side of the square cells of the spatial index, in the units of the coordinates
+CELL_SIZE = 5
+KINDS = ['landmark', 'storm', 'port']
+# The nearest port is looked for only within the range of its distance parameter
+PORT_RANGE = PARAMETERS['port_distance']['max_value']
+
+# Every feature is a circle, its radius is the reach of the feature:
+# the area of a storm, the range a landmark is seen from, or the approach of a port
+Feature = namedtuple('Feature', ['kind', 'name', 'x', 'y', 'radius'])
+
+
+class World:
+    """
+    Map of the features the zeppelin flies among, indexed by uniform grids
+    For the containment queries every feature is stored in all cells its circle overlaps,
+    for the proximity queries it is stored only in the cell of its centre, separately for each kind
+    """
+    def __init__(self, features, cell_size=CELL_SIZE):
+        self.features = features
+        self.cell_size = cell_size
+        self.cells = {}
+        self.centres = {kind: {} for kind in KINDS}
+        self.max_radius = max((feature.radius for feature in features), default=0)
+        for feature in features:
+            for cell in self.cells_around(feature.x, feature.y, feature.radius):
+                self.cells.setdefault(cell, []).append(feature)
+            self.centres[feature.kind].setdefault(self.cell(feature.x, feature.y), []).append(feature)
+
+    @classmethod
+    def load(cls, path=WORLD_PATH):
+        """Return the world described in the JSON file, or None if there is no such file"""
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            data = json.load(file)
+        features = [
+            Feature(kind, entry['name'], entry['x'], entry['y'], entry['radius'])
+            for kind in KINDS
+            for entry in data.get(kind + 's', [])
+        ]
+        return cls(features, data.get('cell_size', CELL_SIZE))
+
+    def cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def cells_around(self, x, y, distance):
+        """Yield all cells overlapping the square around the point"""
+        min_x, min_y = self.cell(x - distance, y - distance)
+        max_x, max_y = self.cell(x + distance, y + distance)
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                yield cell_x, cell_y
+
+    @staticmethod
+    def ring(cell, radius):
+        """Yield the cells forming the square ring of the given radius around the cell"""
+        cell_x, cell_y = cell
+        if not radius:
+            yield cell
+            return
+        for step in range(-radius, radius + 1):
+            yield cell_x + step, cell_y - radius
+            yield cell_x + step, cell_y + radius
+        for step in range(-radius + 1, radius):
+            yield cell_x - radius, cell_y + step
+            yield cell_x + radius, cell_y + step
+
+    def features_at(self, x, y, kind=None):
+        """Return the features of the given kind, or of all kinds, whose circles contain the point"""
+        return [
+            feature
+            for feature in self.cells.get(self.cell(x, y), ())
+            if (feature.x - x) ** 2 + (feature.y - y) ** 2 <= feature.radius ** 2
+            and (kind is None or feature.kind == kind)
+        ]
+
+    def features_near(self, x, y, distance, kind):
+        """Return the features of the kind, whose centres are within the distance from the point"""
+        grid = self.centres[kind]
+        return [
+            feature
+            for cell in self.cells_around(x, y, distance)
+            for feature in grid.get(cell, ())
+            if (feature.x - x) ** 2 + (feature.y - y) ** 2 <= distance ** 2
+        ]
+
+    def nearest_features(self, x, y, kind, max_distance, tolerance=0):
+        """
+        Return the distances and features of the kind, not farther than the nearest one by more than the tolerance
+        The cells are searched in rings around the point, until no closer features can be found in them
+        """
+        grid = self.centres[kind]
+        cell = self.cell(x, y)
+        found = []
+        nearest = None
+        radius = 0
+        # Centres in the cells of a ring are at least radius - 1 cells away from the point
+        while (radius - 1) * self.cell_size <= min(max_distance, nearest + tolerance if found else max_distance):
+            for ring_cell in self.ring(cell, radius):
+                for feature in grid.get(ring_cell, ()):
+                    distance = math.hypot(feature.x - x, feature.y - y)
+                    if distance <= max_distance:
+                        found.append((distance, feature))
+                        if nearest is None or distance < nearest:
+                            nearest = distance
+            radius += 1
+        return [(distance, feature) for distance, feature in found if distance <= nearest + tolerance]
+
+
+class Navigator:
+    """
+    Position of the zeppelin in the world, updated every tick
+    Remembers the features the zeppelin is within, the ones entered and left in the last update, and the nearest port
+    """
+    def __init__(self, world):
+        self.world = world
+        self.inside = frozenset()
+        self.entered = frozenset()
+        self.left = frozenset()
+        self.nearest_port = None
+        self.port_distance = None
+        # Ports that may be the nearest one anywhere in the current cell, gathered when the cell changes
+        self.cell = None
+        self.port_candidates = []
+
+    def update(self, x, y):
+        inside = frozenset(self.world.features_at(x, y))
+        if inside != self.inside or self.entered or self.left:
+            self.entered = inside - self.inside
+            self.left = self.inside - inside
+            self.inside = inside
+
+        cell = self.world.cell(x, y)
+        if cell != self.cell:
+            self.cell = cell
+            self.port_candidates = self.find_port_candidates(cell)
+        self.nearest_port = None
+        self.port_distance = None
+        for port in self.port_candidates:
+            distance = math.hypot(port.x - x, port.y - y)
+            if distance <= PORT_RANGE and (self.port_distance is None or distance < self.port_distance):
+                self.nearest_port = port
+                self.port_distance = distance
+
+    def clearance(self, x, y, reach):
+        """
+        Return the distance from the point to the nearest border of any feature, or the reach if it is farther
+        The zeppelin can't enter nor leave any feature, until it has travelled that distance
+        """
+        clearance = reach
+        for kind in KINDS:
+            for feature in self.world.features_near(x, y, reach + self.world.max_radius, kind):
+                clearance = min(clearance, abs(math.hypot(feature.x - x, feature.y - y) - feature.radius))
+        return clearance
+
+    def find_port_candidates(self, cell):
+        """
+        Return the ports that may be the nearest one to any point of the cell
+        A point of the cell is at most half of its diagonal from the middle, so ports farther from the middle
+        than the nearest one by more than the diagonal can never be the nearest
+        """
+        cell_size = self.world.cell_size
+        diagonal = cell_size * math.sqrt(2)
+        ports = self.world.nearest_features(
+            (cell[0] + 0.5) * cell_size, (cell[1] + 0.5) * cell_size, 'port', PORT_RANGE + diagonal / 2, diagonal
+        )
+        return [port for distance, port in ports]
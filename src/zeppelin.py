@@ -1,11 +1,20 @@
+import math
+
 from src.parameters import *
 from src.const import *
+from src.graph import DependencyGraph, Node
 from src.utils import rotate_vector
+from src.world import Navigator
+from src.scenario import ScenarioRun
 
 
 class Zeppelin:
-    """Object representing the zeppelin with all its parameters"""
-    def __init__(self):
+    """
+    Object representing the zeppelin with all its parameters
+    In a world with map features, the zeppelin is located among them every tick
+    A scenario is played along, its triggers are checked after every tick
+    """
+    def __init__(self, world=None, scenario=None):
         self.parameters = {
             'pressure': Parameter(),
             'height': HeightParameter(),
@@ -20,7 +29,8 @@ class Zeppelin:
             'angular_velocity': Parameter(snap=0),
             'direction': DirectionParameter(),
             'pressure_change': TurnedParameter(),
-            'coordinates': TwoDimensionalParameter()
+            'coordinates': TwoDimensionalParameter(),
+            'port_distance': Parameter(),
         }
 
         for parameter, data in PARAMETERS.items():
@@ -28,18 +38,78 @@ class Zeppelin:
                 self.parameters[parameter].set_range(data['min_value'], data['max_value'])
             self.parameters[parameter].set_value(data['initial_value'])
 
-        self.pressure_cache = self.get_parameter('pressure')
-        self.engine_cache = self.get_parameter('engine_power')
-        self.fuel_consumption_cache = 0
+        self.graph = self.build_graph()
         self.distance_travelled = 0
         self.pressure_change = 0
-        self.velocity_difference = 0
 
         self.crashed = None
 
+        self.navigator = Navigator(world) if world is not None else None
+        if self.navigator is not None:
+            self.update_navigation()
+        self.scenario = ScenarioRun(scenario, self) if scenario is not None else None
+
+    def build_graph(self):
+        """
+        Declare the derived values as nodes of a dependency graph, each updated only when its inputs change
+        Results of the nodes replace the caches of the values they were last computed from
+        """
+        return DependencyGraph(
+            [
+                Node('engine_shutdown', ['fuel', 'engine_power', 'pressure'], ['engine_power', 'pressure'],
+                     self.update_engine_shutdown),
+                Node('settled_pressure', ['pressure', 'pressure_change', 'settled_pressure'],
+                     ['pressure_change', 'destined_height'], self.update_destined_height),
+                Node('climb', ['destined_height', 'height'], ['height', 'destined_height'], self.update_height),
+                Node('thrust', ['engine_power'], ['destined_velocity'], self.update_destined_velocity),
+                Node('velocity_difference', ['destined_velocity', 'velocity'], ['velocity', 'acceleration', 'turn'],
+                     self.update_velocity),
+                Node('consumption', [
+                    'engine_power', 'velocity', 'destined_velocity', 'velocity_difference', 'pressure_change',
+                    'fuel_consumption', 'consumption'
+                ], ['fuel_consumption'], self.update_fuel_consumption),
+            ],
+            self.parameters,
+            {'settled_pressure': self.get_parameter('pressure'), 'velocity_difference': 0, 'consumption': 0}
+        )
+
+    @property
+    def pressure_cache(self):
+        """Pressure the destined height was last computed from"""
+        return self.graph.results['settled_pressure'].value
+
+    @property
+    def velocity_difference(self):
+        """Difference between the destined velocity and the velocity, before the last velocity change"""
+        return self.graph.results['velocity_difference'].value
+
+    @property
+    def fuel_consumption_cache(self):
+        """Fuel consumption before it is limited to the range of its parameter"""
+        return self.graph.results['consumption'].value
+
     def get_parameter(self, parameter):
         return self.parameters[parameter].get_value()
 
+    def get_values(self):
+        """Return a dictionary of the current values of all parameters"""
+        return {parameter: data.get_value() for parameter, data in self.parameters.items()}
+
+    def interpolate_values(self, previous_values, alpha, values=None):
+        """
+        Return the values between the previous tick and the current one, alpha being the fraction of the tick
+        Values of the current tick may be given explicitly, so that the zeppelin itself is not read
+        """
+        if values is None:
+            return {
+                parameter: data.interpolate(previous_values[parameter], alpha)
+                for parameter, data in self.parameters.items()
+            }
+        return {
+            parameter: data.interpolate(previous_values[parameter], alpha, values[parameter])
+            for parameter, data in self.parameters.items()
+        }
+
     def get_range(self, parameter):
         return self.parameters[parameter].get_range()
 
@@ -56,104 +126,207 @@ class Zeppelin:
 
     def update_values(self, milliseconds):
         """Function updates all the values, that are calculated on the basis of other parameters"""
-        # If no fuel, turn off the engine
-        if not self.get_parameter('fuel'):
-            self.turn_off_engine()
-
-        # If pressure has changed, update destined_height
-        self.set_parameter('pressure_change', abs(self.pressure_cache - self.get_parameter('pressure')))
-        if self.get_parameter('pressure_change'):
-            self.pressure_cache = self.get_parameter('pressure')
-            self.set_parameter('destined_height', self.get_height_from_pressure())
-
-        # If height != destined_height, update height
-        height_difference = self.get_parameter('destined_height') - self.get_parameter('height')
-        if abs(height_difference) > 0:
-            # If difference is minimal, just set the destined value to prevent infinite loop
-            if abs(height_difference) < MINIMAL_STEP:
-                self.set_parameter('height', self.get_parameter('destined_height'))
-            else:
-                self.change_parameter(
-                    'height',
-                    min(
-                        height_difference / HEIGHT_CHANGE_DIVIDER,
-                        PARAMETERS['height']['max_step']
-                    )
-                )
-            # when the zeppelin touches the ground, set destined_parameter to zero
-            # so that it doesn't force to calculate height_change every time
-            if self.get_parameter('height') == self.parameters['height'].min_value:
-                self.set_parameter('destined_height', self.get_parameter('height'))
-
-        # If engine_power has changed, update destined_velocity and acceleration
-        engine_change = abs(self.engine_cache - self.get_parameter('engine_power'))
-        if engine_change:
-            self.engine_cache = self.get_parameter('pressure')
-            self.set_parameter('destined_velocity', self.get_velocity_from_engine_power())
-
-        # If velocity != destined_velocity, update velocity and turn
-        self.velocity_difference = self.get_parameter('destined_velocity') - self.get_turned_velocity()
-        if abs(self.velocity_difference) > 0:
-            # If difference is minimal, stop the changes to prevent infinite loop
-            if abs(self.velocity_difference) < MINIMAL_STEP:
-                self.set_parameter('velocity', self.get_parameter('destined_velocity'))
-            else:
-                self.set_parameter('acceleration', self.get_acceleration())
-                self.change_parameter(
-                    'velocity',
-                    self.get_parameter('acceleration')
-                )
-            self.set_parameter('turn', self.get_turn())
+        # Derived values are recomputed only when their inputs have changed
+        self.graph.evaluate()
 
+        # Parameters are accessed directly in this hot path, get_parameter and set_parameter are the public facade
+        parameters = self.parameters
+        velocity = parameters['velocity']
+        angular_velocity = parameters['angular_velocity']
+        direction = parameters['direction']
 
         # Update direction based on angular_velocity and velocity
-        if self.get_parameter('angular_velocity'):
-            self.change_parameter(
-                'direction',
-                self.get_parameter('angular_velocity') * self.get_turned_velocity() / 500
-            )
-
-        # Calculate fuel consumption
-        self.fuel_consumption_cache = self.calculate_fuel_consumption()
-        self.set_parameter('fuel_consumption', self.fuel_consumption_cache)
+        if angular_velocity.value:
+            direction.change(angular_velocity.value * velocity.value / 500)
 
         # Calculate the distance
-        distance = self.get_parameter('velocity') * milliseconds / 1000 / 3600
+        distance = abs(velocity.value) * milliseconds / 1000 / 3600
         self.distance_travelled += distance
-        self.change_parameter('coordinates', rotate_vector((0, -distance), -self.get_parameter('direction')))
+        parameters['coordinates'].change(rotate_vector((0, -distance), -direction.value))
 
         # Calculate how much fuel has been consumed during last frame
-        consumed_fuel = distance * self.get_parameter('fuel_consumption') / 10
-        self.change_parameter('fuel', -consumed_fuel)
+        consumed_fuel = distance * parameters['fuel_consumption'].value / 10
+        parameters['fuel'].change(-consumed_fuel)
+
+        if self.navigator is not None:
+            self.update_navigation()
+        if self.scenario is not None:
+            self.scenario.update(milliseconds)
+
+    def update_engine_shutdown(self):
+        """If no fuel, turn off the engine"""
+        if not self.parameters['fuel'].value:
+            self.turn_off_engine()
+
+    def update_destined_height(self):
+        """If pressure has changed, update destined_height, return the pressure it was computed from"""
+        pressure = self.parameters['pressure']
+        pressure_change = self.parameters['pressure_change']
+        pressure_change.set_value(abs(self.pressure_cache - pressure.value))
+        if not pressure_change.value:
+            return self.pressure_cache
+        self.parameters['destined_height'].set_value(self.get_height_from_pressure())
+        return pressure.value
+
+    def update_height(self):
+        """If height != destined_height, update height"""
+        height = self.parameters['height']
+        destined_height = self.parameters['destined_height']
+        height_difference = destined_height.value - height.value
+        if not height_difference:
+            return
+        # If difference is minimal, just set the destined value to prevent infinite loop
+        if abs(height_difference) < MINIMAL_STEP:
+            height.set_value(destined_height.value)
+        elif height.change(min(height_difference / HEIGHT_CHANGE_DIVIDER, PARAMETERS['height']['max_step'])):
+            self.crashed = True
+        # when the zeppelin touches the ground, set destined_parameter to zero
+        # so that it doesn't force to calculate height_change every time
+        if height.value == height.min_value:
+            destined_height.set_value(height.value)
+
+    def update_destined_velocity(self):
+        self.parameters['destined_velocity'].set_value(self.get_velocity_from_engine_power())
+
+    def update_velocity(self):
+        """If velocity != destined_velocity, update velocity and turn, return the difference before the change"""
+        velocity = self.parameters['velocity']
+        velocity_difference = self.parameters['destined_velocity'].value - velocity.value
+        if velocity_difference:
+            # If difference is minimal, stop the changes to prevent infinite loop
+            if abs(velocity_difference) < MINIMAL_STEP:
+                velocity.set_value(self.parameters['destined_velocity'].value)
+            else:
+                acceleration = self.parameters['acceleration']
+                acceleration.set_value(self.get_acceleration(velocity_difference))
+                velocity.change(acceleration.value)
+            self.parameters['turn'].set_value(velocity.get_turn())
+        return velocity_difference
+
+    def update_fuel_consumption(self):
+        """Calculate fuel consumption, return it before it is limited to the range of its parameter"""
+        consumption = self.calculate_fuel_consumption()
+        self.parameters['fuel_consumption'].set_value(consumption)
+        return consumption
+
+    def update_navigation(self):
+        """Locate the zeppelin in the world and update the distance to the nearest port"""
+        self.navigator.update(*self.parameters['coordinates'].value)
+        port_distance = self.parameters['port_distance']
+        if self.navigator.port_distance is None:
+            port_distance.set_value(port_distance.max_value)
+        else:
+            port_distance.set_value(self.navigator.port_distance)
+
+    def advance(self, milliseconds, tick_milliseconds=TICK_MILLISECONDS):
+        """
+        Fast-forward the zeppelin by the given time, with the controls left as they are
+        Ticks are stepped one by one only until the values settle, then the steady cruise is calculated at once
+        Return the number of advanced ticks, fewer if the zeppelin crashes
+        """
+        ticks = round(milliseconds / tick_milliseconds)
+        advanced = 0
+        while advanced < ticks and not self.crashed:
+            if self.is_steady():
+                cruised = self.cruise(ticks - advanced, tick_milliseconds)
+                if cruised:
+                    advanced += cruised
+                    continue
+            self.update_values(tick_milliseconds)
+            advanced += 1
+        return advanced
+
+    def is_steady(self):
+        """
+        Check if the following ticks change only the direction, coordinates, distance and fuel, at constant rates
+        That is when the height and velocity have reached their destined values and the fuel consumption has settled
+        """
+        parameters = self.parameters
+        velocity = parameters['velocity'].value
+        return (
+            not self.crashed
+            and (parameters['fuel'].value > 0 or not parameters['engine_power'].value)
+            and parameters['pressure'].value == self.pressure_cache
+            and not parameters['pressure_change'].value
+            and parameters['height'].value == parameters['destined_height'].value
+            and parameters['destined_velocity'].value == self.get_velocity_from_engine_power()
+            and velocity == parameters['destined_velocity'].value
+            and not self.velocity_difference
+            and self.fuel_consumption_cache == self.fuel_consumption_from_engine_power()
+            and parameters['fuel_consumption'].value == self.fuel_consumption_cache
+        )
+
+    def cruise(self, ticks, milliseconds):
+        """
+        Advance a steady zeppelin by the given number of ticks at once, return the number of advanced ticks
+        It stops short of running out of fuel, so that the engine shutdown is stepped tick by tick
+        """
+        parameters = self.parameters
+        velocity = parameters['velocity'].value
+        direction = parameters['direction']
+        fuel = parameters['fuel']
+
+        distance = abs(velocity) * milliseconds / 1000 / 3600
+        consumed_fuel = distance * parameters['fuel_consumption'].value / 10
+        if consumed_fuel:
+            ticks = min(ticks, math.ceil(fuel.value / consumed_fuel) - 2)
+        # The direction changes by the same angle every tick, before the distance of the tick is covered
+        angle_step = parameters['angular_velocity'].value * velocity / 500
+        # The ticks in which the triggers of the scenario may fire are stepped, as their actions may change the controls
+        if self.scenario is not None:
+            ticks = min(ticks, self.scenario.cruise_ticks(
+                milliseconds, distance, {'fuel': -consumed_fuel, 'direction': angle_step}
+            ))
+        if ticks <= 0:
+            return 0
+        first_angle = direction.value + angle_step
+        if angle_step:
+            # Sum of the unit vectors of all directions, as a geometric series on the unit circle
+            middle = math.radians(first_angle + angle_step * (ticks - 1) / 2)
+            factor = math.sin(math.radians(angle_step) * ticks / 2) / math.sin(math.radians(angle_step) / 2)
+            sum_x, sum_y = math.sin(middle) * factor, math.cos(middle) * factor
+        else:
+            sum_x, sum_y = math.sin(math.radians(first_angle)) * ticks, math.cos(math.radians(first_angle)) * ticks
+
+        x, y = parameters['coordinates'].value
+        parameters['coordinates'].set_value((x + distance * sum_x, y - distance * sum_y))
+        direction.set_value((direction.value + angle_step * ticks) % direction.max_value)
+        self.distance_travelled += distance * ticks
+        fuel.set_value(fuel.value - consumed_fuel * ticks)
+        # Without a scenario watching them, features passed through on the way are skipped
+        if self.navigator is not None:
+            self.update_navigation()
+        if self.scenario is not None:
+            self.scenario.update(milliseconds * ticks)
+        return ticks
 
     def get_turn(self):
         return self.parameters['velocity'].get_turn()
 
     def get_height_from_pressure(self):
         """Return the height value that is destined for the current pressure"""
-        pressure = self.get_parameter('pressure')
-        return PARAMETERS['pressure']['initial_value'] - pressure
+        return PARAMETERS['pressure']['initial_value'] - self.parameters['pressure'].value
 
     def get_velocity_from_engine_power(self):
         """Return the velocity value that is destined for the current engine power"""
-        return self.get_parameter('engine_power')
+        return self.parameters['engine_power'].value
 
-    def get_acceleration(self):
-        """Return the acceleration value that emerges from the current velocity difference"""
+    def get_acceleration(self, velocity_difference):
+        """Return the acceleration value that emerges from the given velocity difference"""
         if not self.is_accelerating():
             return self.get_velocity_lambda_turn() * min(
-                abs(self.velocity_difference) / ACCELERATION_DIVIDER / 3,
+                abs(velocity_difference) / ACCELERATION_DIVIDER / 3,
                 DECELERATION_LIMIT
             )
         if self.get_velocity_lambda_turn() > 0:
-            return self.velocity_difference / ACCELERATION_DIVIDER
+            return velocity_difference / ACCELERATION_DIVIDER
         else:
-            return self.velocity_difference / ACCELERATION_DIVIDER / 3
+            return velocity_difference / ACCELERATION_DIVIDER / 3
 
     def is_accelerating(self):
         """Check if the zeppelin is currently actively increasing its velocity"""
-        v = self.get_turned_velocity()
-        dv = self.get_parameter('destined_velocity')
+        v = self.parameters['velocity'].value
+        dv = self.parameters['destined_velocity'].value
         if dv == 0:
             return False
         if v * dv < 0:
@@ -164,8 +337,8 @@ class Zeppelin:
 
     def get_velocity_lambda_turn(self):
         """Check the turn of the current velocity_difference"""
-        v = self.get_turned_velocity()
-        dv = self.get_parameter('destined_velocity')
+        v = self.parameters['velocity'].value
+        dv = self.parameters['destined_velocity'].value
         if dv > v:
             return 1
         if dv < v:
@@ -179,28 +352,32 @@ class Zeppelin:
         consumption = self.fuel_consumption_from_engine_power()
 
         # Include positive modifier for active acceleration
+        velocity_difference = self.velocity_difference
         if self.is_accelerating():
-            consumption += abs(self.velocity_difference) / ACCELERATION_MODIFIER_DIVIDER
+            consumption += abs(velocity_difference) / ACCELERATION_MODIFIER_DIVIDER
 
         # Include negative modifier for passive deceleration
         else:
-            consumption -= abs(self.velocity_difference) / DECELERATION_MODIFIER_DIVIDER
+            consumption -= abs(velocity_difference) / DECELERATION_MODIFIER_DIVIDER
 
         # Include fuel consumed by changing pressure
-        if self.get_parameter('pressure_change'):
-            consumption += abs(self.get_parameter('pressure_change')) / PRESSURE_DIVIDER_MODIFIER
+        pressure_change = self.parameters['pressure_change'].value
+        if pressure_change:
+            consumption += abs(pressure_change) / PRESSURE_DIVIDER_MODIFIER
 
         # Limit the ultimate value to the max step, so that the indicator hand goes smoothly
-        if consumption - self.fuel_consumption_cache > PARAMETERS['fuel_consumption']['step']:
-            consumption = self.fuel_consumption_cache + PARAMETERS['fuel_consumption']['step']
-        elif self.fuel_consumption_cache - consumption > PARAMETERS['fuel_consumption']['step']:
-            consumption = self.fuel_consumption_cache - PARAMETERS['fuel_consumption']['step']
+        step = PARAMETERS['fuel_consumption']['step']
+        previous_consumption = self.fuel_consumption_cache
+        if consumption - previous_consumption > step:
+            consumption = previous_consumption + step
+        elif previous_consumption - consumption > step:
+            consumption = previous_consumption - step
 
         return consumption
 
     def fuel_consumption_from_engine_power(self):
         """Calculates the basic consumption based on engine power"""
-        power = abs(self.get_parameter('engine_power'))
+        power = abs(self.parameters['engine_power'].value)
         if power == 0:
             return 0
         return (power - 50) ** 2 / 125 + 10